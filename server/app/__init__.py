@@ -45,6 +45,10 @@ def create_app(config_name='development'):
     app.logger.setLevel(logging.INFO)
     app.logger.info('Fast BI iGreen API iniciando...')
     
+    # Serialização JSON e compressão das respostas
+    from app.utils.serialization import init_json
+    init_json(app)
+    
     # Registrar blueprints
     from app.routes.auth import auth_bp
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -52,6 +56,52 @@ def create_app(config_name='development'):
     from app.routes.dashboard import dashboard_bp
     app.register_blueprint(dashboard_bp)
     
+    # Catálogo de tabelas/colunas do banco (carregado uma vez e atualizado por timer)
+    from app.services.schema_catalog import schema_catalog
+    schema_catalog.init_app(app)
+    
+    # Métricas, KPIs e gráficos do dashboard
+    from app.routes.metrics import metrics_bp
+    from app.services.live_feed import live_feed
+    app.register_blueprint(metrics_bp)
+    live_feed.init_app(app)
+    
+    # Conexões do DataService emprestadas do pool (uma por requisição)
+    from app.services.data_service import DataService
+    DataService.init_app(app)
+    
+    # Login: verificação de senha em pool limitado e limite de tentativas
+    from app.services.password_verifier import password_verifier
+    from app.services.login_limiter import login_limiter
+    password_verifier.init_app(app)
+    login_limiter.init_app(app)
+    
+    # Cache dos perfis de usuário (verificação do token)
+    from app.services.user_cache import init_user_cache
+    init_user_cache(app)
+    
+    # Circuit breaker do banco de origem
+    from app.services.circuit_breaker import db_breaker
+    db_breaker.init_app(app)
+    
+    # Cache em memória dos cards
+    from app.services.card_engine import init_card_cache
+    init_card_cache(app)
+    
+    # Exportações em segundo plano
+    from app.routes.exports import exports_bp
+    from app.services.export_jobs import export_jobs
+    app.register_blueprint(exports_bp, url_prefix='/api/exports')
+    export_jobs.init_app(app)
+    
+    # Cache em disco das exportações de meses fechados
+    from app.services.export_store import export_store
+    export_store.init_app(app)
+    
+    # Pré-aquecimento dos cards mais pedidos do período corrente
+    from app.services.prewarm import prewarmer
+    prewarmer.init_app(app)
+    
     # Health check
     @app.route('/api/health')
     def health_check():
@@ -4,6 +4,17 @@ from datetime import datetime
 
 bcrypt = Bcrypt()
 
+def check_password_hash(password_hash, password_input):
+    """Confere a senha com o hash bcrypt (False se não houver hash ou ele for inválido)"""
+    if password_hash:
+        try:
+            # Bcrypt precisa de bytes
+            return bcrypt.check_password_hash(password_hash, password_input)
+        except Exception as e:
+            print(f"Erro ao verificar senha: {e}")
+            return False
+    return False
+
 class Usuario(db.Model):
     __tablename__ = 'USUARIOS'  # Nome exato da tabela em maiúscula
     __table_args__ = {'schema': 'public', 'extend_existing': True}
@@ -21,14 +32,7 @@ class Usuario(db.Model):
     
     def check_password(self, password_input):
         """Verifica se a senha está correta"""
-        if self.password:
-            try:
-                # Bcrypt precisa de bytes
-                return bcrypt.check_password_hash(self.password, password_input)
-            except Exception as e:
-                print(f"Erro ao verificar senha: {e}")
-                return False
-        return False
+        return check_password_hash(self.password, password_input)
     
     def to_dict(self):
         return {
@@ -1,12 +1,22 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
 from app.models.usuario import Usuario
+from app.services.login_limiter import login_limiter
+from app.services.password_verifier import VerifierBusy, password_verifier
+from app.services.user_cache import cache_user, get_user_profile, invalidate_user
 from app import db
 import logging
 
 auth_bp = Blueprint('auth', __name__)
 logger = logging.getLogger(__name__)
 
+def too_many_attempts(message, retry_after=None):
+    response = jsonify({'error': message})
+    response.status_code = 429
+    if retry_after:
+        response.headers['Retry-After'] = str(retry_after)
+    return response
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     try:
@@ -17,17 +27,30 @@ def login():
         if not email or not password:
             return jsonify({'error': 'Email e senha são obrigatórios'}), 400
         
+        # Limite de tentativas por IP e bloqueio do email após falhas seguidas
+        retry_after = login_limiter.hit_ip(request.remote_addr)
+        if retry_after:
+            logger.warning(f"Limite de tentativas de login atingido para o IP: {request.remote_addr}")
+            return too_many_attempts('Muitas tentativas de login, tente novamente mais tarde', retry_after)
+        retry_after = login_limiter.locked(email)
+        if retry_after:
+            return too_many_attempts('Login bloqueado temporariamente por excesso de tentativas', retry_after)
+        
         # Buscar usuário no banco
         usuario = Usuario.query.filter_by(email=email).first()
         
         if not usuario:
             logger.warning(f"Tentativa de login com email não encontrado: {email}")
+            login_limiter.record_failure(email)
             return jsonify({'error': 'Credenciais inválidas'}), 401
         
-        # Verificar senha
-        if not usuario.check_password(password):
+        # Verificar senha (bcrypt no pool limitado, fora da thread da requisição)
+        if not password_verifier.verify(usuario.password, password):
             logger.warning(f"Senha incorreta para o email: {email}")
+            if login_limiter.record_failure(email):
+                logger.warning(f"Email bloqueado por excesso de tentativas: {email}")
             return jsonify({'error': 'Credenciais inválidas'}), 401
+        login_limiter.record_success(email)
         
         # Verificar se usuário está ativo
         if not usuario.is_active:
@@ -42,9 +65,11 @@ def login():
         return jsonify({
             'access_token': access_token,
             'refresh_token': refresh_token,
-            'user': usuario.to_dict()
+            'user': cache_user(usuario)
         }), 200
         
+    except VerifierBusy as e:
+        return too_many_attempts(str(e), retry_after=1)
     except Exception as e:
         logger.error(f"Erro no login: {str(e)}")
         return jsonify({'error': 'Erro interno do servidor'}), 500
@@ -54,14 +79,15 @@ def login():
 def verify_token():
     try:
         user_id = get_jwt_identity()
-        usuario = Usuario.query.get(user_id)
+        # Perfil em cache (USER_CACHE_TTL), sem consulta ao banco a cada navegação
+        profile = get_user_profile(user_id)
         
-        if not usuario:
+        if not profile:
             return jsonify({'error': 'Usuário não encontrado'}), 404
             
         return jsonify({
             'valid': True,
-            'user': usuario.to_dict()
+            'user': profile
         }), 200
         
     except Exception as e:
@@ -73,6 +99,8 @@ def verify_token():
 def refresh():
     try:
         user_id = get_jwt_identity()
+        # Renovação do token recarrega o perfil do banco na próxima verificação
+        invalidate_user(user_id)
         access_token = create_access_token(identity=user_id)
         
         return jsonify({'access_token': access_token}), 200
@@ -1,45 +1,31 @@
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, current_app, jsonify, request, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from sqlalchemy import text
-from datetime import datetime, timedelta
-from decimal import Decimal
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
-import io
+from itertools import chain
 import traceback
-from dateutil.relativedelta import relativedelta
+from app.services.card_registry import get_card
+from app.services.available_dates import available_dates_cache
+from app.services.export_store import export_store
+from app.services.period import is_closed_month
+from sqlalchemy.exc import OperationalError
+from app.services.circuit_breaker import CircuitOpen
+from app.services.single_flight import SingleFlightTimeout
+from app.utils.http_cache import conditional_json, period_json
+from app.services.exports import (
+    EXPORT_FORMATS, STREAMED_FORMATS, stream_query, temporary_export_path,
+    temporary_file_response, csv_response, write_export_file, export_filename,
+    export_sheet_name, remove_file
+)
+from app.services.card_engine import (
+    fetch_card, fetch_cards, fetch_preview_page, build_export_query,
+    resolve_columns, unavailable_result, card_cache
+)
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
-def decimal_to_float(obj):
-    """Converter Decimal para float para serialização JSON"""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    return obj
-
-def calculate_previous_month(date_filter):
-    """
-    Calcula o mês anterior baseado no formato YYYY-MM
-    Retorna string no formato MM/YYYY para uso nas queries
-    """
-    try:
-        year, month = date_filter.split('-')
-        current_date = datetime(int(year), int(month), 1)
-        previous_date = current_date - relativedelta(months=1)
-        return previous_date.strftime('%m/%Y')
-    except:
-        return None
-
-def calc_variacao(atual, anterior):
-    """Calcula variação percentual entre dois valores"""
-    if anterior and anterior > 0:
-        return round(((atual - anterior) / anterior) * 100, 2)
-    return None
-
-def get_current_day_of_month():
-    """Retorna o dia atual do mês como inteiro"""
-    return datetime.now().day
+# Quantidade de linhas por página da prévia (padrão e máximo)
+PREVIEW_LIMIT = 50
+PREVIEW_MAX_PAGE_SIZE = 500
 
 # ========================================
 # DASHBOARD COM ESTRUTURA DE FILTROS
@@ -51,27 +37,15 @@ def get_current_day_of_month():
 def get_available_dates():
     """
     Retorna as datas disponíveis na base para o filtro
+    A lista vem do cache em memória e o navegador pode revalidar via ETag
     """
     try:
-        with db.engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT to_char("data cadastro", 'MM/YYYY') AS mes_ano,
-                       to_char("data cadastro", 'YYYY-MM') AS mes_valor,
-                       MIN("data cadastro") AS data_ordenacao
-                FROM public."V_CUSTOMER"
-                WHERE "data cadastro" IS NOT NULL
-                GROUP BY to_char("data cadastro", 'MM/YYYY'), to_char("data cadastro", 'YYYY-MM')
-                ORDER BY MIN("data cadastro") DESC
-            """))
-            
-            dates = []
-            for row in result:
-                dates.append({
-                    'label': row[0],  # MM/YYYY format
-                    'value': row[1]   # YYYY-MM format
-                })
-            
-            return jsonify(dates), 200
+        dates, etag = available_dates_cache.get()
+        
+        return conditional_json(
+            dates, etag=etag,
+            max_age=current_app.config.get('AVAILABLE_DATES_BROWSER_MAX_AGE', 300)
+        )
             
     except Exception as e:
         print(f"Erro em get_available_dates: {str(e)}")
@@ -90,436 +64,247 @@ def get_card_data(card_name):
         date_filter = request.args.get('date')  # YYYY-MM format
         consolidated = request.args.get('consolidated', 'false').lower() == 'true'
         
-        with db.engine.connect() as conn:
-            result = {'value': 0, 'available': False, 'change': None}
-            
-            # CARD: Total de Cadastrados
-            if card_name == 'clientes_cadastrados':
-                if consolidated:
-                    # Query do número consolidado (sem variação)
-                    query_result = conn.execute(text("""
-                        SELECT COUNT(*) AS total_clientes_cadastrados_consolidados
-                        FROM public."V_CUSTOMER"
-                        WHERE "data cadastro" IS NOT NULL
-                    """))
-                    
-                    if query_result:
-                        row = query_result.fetchone()
-                        result = {
-                            'value': row[0] if row else 0,
-                            'available': True,
-                            'change': None  # Sem variação no modo consolidado
-                        }
-                else:
-                    # Converter YYYY-MM para MM/YYYY
-                    if date_filter:
-                        year, month = date_filter.split('-')
-                        date_format = f"{month}/{year}"
-                        
-                        # Query do número por mês ATUAL
-                        current_query = conn.execute(text("""
-                            SELECT COUNT(*) AS total_clientes_cadastrados_no_mes
-                            FROM public."V_CUSTOMER"
-                            WHERE to_char("data cadastro", 'MM/YYYY') = :date_format
-                        """), {'date_format': date_format})
-                        
-                        current_row = current_query.fetchone()
-                        current_value = current_row[0] if current_row else 0
-                        
-                        # Detectar se é o mês atual para decidir tipo de comparação
-                        current_month_str = datetime.now().strftime('%m/%Y')
-                        is_current_month = (date_format == current_month_str)
-                        
-                        # Calcular mês anterior e buscar dados para comparação
-                        previous_month = calculate_previous_month(date_filter)
-                        change_percentage = None
-                        
-                        if previous_month:
-                            try:
-                                if is_current_month:
-                                    # Mês atual: comparação proporcional (até hoje vs mesmo dia do mês anterior)
-                                    current_day = get_current_day_of_month()
-                                    
-                                    # Query proporcional do mês ANTERIOR até mesmo dia
-                                    previous_query = conn.execute(text("""
-                                        SELECT COUNT(*) AS total_clientes_cadastrados_mes_anterior
-                                        FROM public."V_CUSTOMER"
-                                        WHERE to_char("data cadastro", 'MM/YYYY') = :previous_date
-                                        AND "data cadastro" IS NOT NULL
-                                        AND EXTRACT(day FROM "data cadastro") <= :current_day
-                                    """), {
-                                        'previous_date': previous_month,
-                                        'current_day': current_day
-                                    })
-                                    
-                                    previous_row = previous_query.fetchone()
-                                    previous_value = previous_row[0] if previous_row else 0
-                                    
-                                    # Query proporcional do mês ATUAL até hoje
-                                    current_proportional_query = conn.execute(text("""
-                                        SELECT COUNT(*) AS total_clientes_cadastrados_atual_proporcional
-                                        FROM public."V_CUSTOMER"
-                                        WHERE to_char("data cadastro", 'MM/YYYY') = :current_date
-                                        AND "data cadastro" IS NOT NULL
-                                        AND EXTRACT(day FROM "data cadastro") <= :current_day
-                                    """), {
-                                        'current_date': date_format,
-                                        'current_day': current_day
-                                    })
-                                    
-                                    current_proportional_row = current_proportional_query.fetchone()
-                                    current_proportional_value = current_proportional_row[0] if current_proportional_row else 0
-                                    
-                                    # Usar o valor proporcional que acabamos de calcular
-                                    change_percentage = calc_variacao(current_proportional_value, previous_value)
-                                    
-                                else:
-                                    # Mês anterior: comparação completa (mês fechado vs mês fechado anterior)
-                                    # Query completa do mês ANTERIOR
-                                    previous_query = conn.execute(text("""
-                                        SELECT COUNT(*) AS total_clientes_cadastrados_mes_anterior
-                                        FROM public."V_CUSTOMER"
-                                        WHERE to_char("data cadastro", 'MM/YYYY') = :previous_date
-                                        AND "data cadastro" IS NOT NULL
-                                    """), {
-                                        'previous_date': previous_month
-                                    })
-                                    
-                                    previous_row = previous_query.fetchone()
-                                    previous_value = previous_row[0] if previous_row else 0
-                                    
-                                    # Usar o valor total do mês atual (já calculado acima)
-                                    # Para mês fechado: comparar total vs total
-                                    change_percentage = calc_variacao(current_value, previous_value)
-                                
-                            except Exception as e:
-                                pass
-                        
-                        result = {
-                            'value': current_value,
-                            'available': True,
-                            'change': change_percentage
-                        }
-                    else:
-                        result = {'value': 0, 'available': False, 'change': None}
-            
-            # Card: Total de Ativações
-            elif card_name == 'total_ativacoes':
-                if consolidated:
-                    # Query do número consolidado (sem variação)
-                    query_result = conn.execute(text("""
-                        SELECT COUNT(*) AS total_clientes_consolidados
-                        FROM public."V_CUSTOMER"
-                        WHERE "data ativo" IS NOT NULL
-                    """))
-                    
-                    if query_result:
-                        row = query_result.fetchone()
-                        result = {
-                            'value': row[0] if row else 0,
-                            'available': True,
-                            'change': None  # Sem variação no modo consolidado
-                        }
-                else:
-                    # Converter YYYY-MM para MM/YYYY
-                    if date_filter:
-                        year, month = date_filter.split('-')
-                        date_format = f"{month}/{year}"
-                        
-                        # Query do número por mês ATUAL
-                        current_query = conn.execute(text("""
-                            SELECT COUNT(*) AS total_clientes_no_mes
-                            FROM public."V_CUSTOMER"
-                            WHERE to_char("data ativo", 'MM/YYYY') = :date_format
-                        """), {'date_format': date_format})
-                        
-                        current_row = current_query.fetchone()
-                        current_value = current_row[0] if current_row else 0
-                        
-                        # Detectar se é o mês atual para decidir tipo de comparação
-                        current_month_str = datetime.now().strftime('%m/%Y')
-                        is_current_month = (date_format == current_month_str)
-                        
-                        # Calcular mês anterior e buscar dados para comparação
-                        previous_month = calculate_previous_month(date_filter)
-                        change_percentage = None
-                        
-                        if previous_month:
-                            try:
-                                if is_current_month:
-                                    # Mês atual: comparação proporcional (até hoje vs mesmo dia do mês anterior)
-                                    current_day = get_current_day_of_month()
-                                    
-                                    # Query proporcional do mês ANTERIOR até mesmo dia
-                                    previous_query = conn.execute(text("""
-                                        SELECT COUNT(*) AS total_clientes_mes_anterior
-                                        FROM public."V_CUSTOMER"
-                                        WHERE to_char("data ativo", 'MM/YYYY') = :previous_date
-                                        AND "data ativo" IS NOT NULL
-                                        AND EXTRACT(day FROM "data ativo") <= :current_day
-                                    """), {
-                                        'previous_date': previous_month,
-                                        'current_day': current_day
-                                    })
-                                    
-                                    previous_row = previous_query.fetchone()
-                                    previous_value = previous_row[0] if previous_row else 0
-                                    
-                                    # Query proporcional do mês ATUAL até hoje
-                                    current_proportional_query = conn.execute(text("""
-                                        SELECT COUNT(*) AS total_clientes_atual_proporcional
-                                        FROM public."V_CUSTOMER"
-                                        WHERE to_char("data ativo", 'MM/YYYY') = :current_date
-                                        AND "data ativo" IS NOT NULL
-                                        AND EXTRACT(day FROM "data ativo") <= :current_day
-                                    """), {
-                                        'current_date': date_format,
-                                        'current_day': current_day
-                                    })
-                                    
-                                    current_proportional_row = current_proportional_query.fetchone()
-                                    current_proportional_value = current_proportional_row[0] if current_proportional_row else 0
-                                    
-                                    # Usar o valor proporcional que acabamos de calcular
-                                    change_percentage = calc_variacao(current_proportional_value, previous_value)
-                                    
-                                else:
-                                    # Mês anterior: comparação completa (mês fechado vs mês fechado anterior)
-                                    # Query completa do mês ANTERIOR
-                                    previous_query = conn.execute(text("""
-                                        SELECT COUNT(*) AS total_clientes_mes_anterior
-                                        FROM public."V_CUSTOMER"
-                                        WHERE to_char("data ativo", 'MM/YYYY') = :previous_date
-                                        AND "data ativo" IS NOT NULL
-                                    """), {
-                                        'previous_date': previous_month
-                                    })
-                                    
-                                    previous_row = previous_query.fetchone()
-                                    previous_value = previous_row[0] if previous_row else 0
-                                    
-                                    # Usar o valor total do mês atual (já calculado acima)
-                                    # Para mês fechado: comparar total vs total
-                                    change_percentage = calc_variacao(current_value, previous_value)
-                                
-                            except Exception as e:
-                                pass
-                        
-                        result = {
-                            'value': current_value,
-                            'available': True,
-                            'change': change_percentage
-                        }
-                    else:
-                        result = {'value': 0, 'available': False, 'change': None}
-            
-            return jsonify(result), 200
+        card = get_card(card_name)
+        if card is None:
+            result = unavailable_result()
+        else:
+            result = fetch_card(card, date_filter=date_filter, consolidated=consolidated)
+        
+        return period_json(result, date_filter=date_filter, consolidated=consolidated)
             
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except (SingleFlightTimeout, CircuitOpen) as e:
+        return jsonify({'error': str(e)}), 503
+    except OperationalError as e:
+        print(f"Banco indisponível: {str(e)}")
+        return jsonify({'error': 'Banco de dados indisponível no momento, tente novamente em instantes'}), 503
     except Exception as e:
         print(f"Erro em get_card_data para {card_name}: {str(e)}")
         return jsonify({'error': f'Erro ao buscar dados do card {card_name}'}), 500
 
-def safe_excel_value(value):
-    """Converter valor para formato seguro para Excel"""
-    if value is None:
-        return ''
-    elif isinstance(value, Decimal):
-        return float(value)
-    elif isinstance(value, (datetime, )):
-        # Datas datetime para string
-        return value.strftime('%Y-%m-%d %H:%M:%S') if hasattr(value, 'hour') else value.strftime('%Y-%m-%d')
-    elif hasattr(value, 'date'):
-        # Objetos date para string
-        return value.strftime('%Y-%m-%d')
+def parse_batch_params():
+    """
+    Lê os parâmetros do endpoint de cards em lote
+    GET usa query string (names=a,b,c); POST aceita JSON com names como lista
+    Retorna (names, date_filter, consolidated)
+    Lança ValueError quando names não é uma lista de textos
+    """
+    if request.method == 'POST':
+        payload = request.get_json(silent=True) or {}
+        if not isinstance(payload, dict):
+            raise ValueError('Corpo da requisição deve ser um objeto JSON')
     else:
-        # Qualquer outro tipo: converter para string
-        return str(value)
+        payload = request.args
+
+    names = payload.get('names')
+    if names is None:
+        names = []
+    elif isinstance(names, str):
+        names = names.split(',')
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        raise ValueError('names deve ser uma lista de nomes')
+    names = [name.strip() for name in names if name and name.strip()]
+
+    consolidated = payload.get('consolidated', False)
+    if isinstance(consolidated, str):
+        consolidated = consolidated.lower() == 'true'
+
+    return list(dict.fromkeys(names)), payload.get('date'), bool(consolidated)
+
+@dashboard_bp.route('/api/dashboard/cards', methods=['GET', 'POST'])
+@jwt_required()
+def get_cards_data():
+    """
+    Endpoint em lote: retorna todos os cards pedidos em uma única resposta
+    Cards da mesma view de origem são calculados em uma única query
+    """
+    try:
+        names, date_filter, consolidated = parse_batch_params()
+        if not names:
+            return jsonify({'error': 'Informe os cards no parâmetro names'}), 400
+
+        cards = [get_card(name) for name in names]
+        known_cards = [card for card in cards if card is not None]
+
+        computed = fetch_cards(
+            known_cards, date_filter=date_filter, consolidated=consolidated
+        ) if known_cards else {}
+
+        results = {name: computed.get(name) or unavailable_result() for name in names}
+        return period_json({'cards': results}, date_filter=date_filter, consolidated=consolidated)
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except (SingleFlightTimeout, CircuitOpen) as e:
+        return jsonify({'error': str(e)}), 503
+    except OperationalError as e:
+        print(f"Banco indisponível: {str(e)}")
+        return jsonify({'error': 'Banco de dados indisponível no momento, tente novamente em instantes'}), 503
+    except Exception as e:
+        print(f"Erro em get_cards_data: {str(e)}")
+        return jsonify({'error': 'Erro ao buscar dados dos cards'}), 500
+
+@dashboard_bp.route('/api/dashboard/cache/stats', methods=['GET'])
+@jwt_required()
+def get_cache_stats():
+    """Contadores do cache de cards (acertos, erros, tamanho)"""
+    return jsonify({'cards': card_cache.stats()}), 200
+
+def requested_columns(card):
+    """
+    Colunas pedidas na query string: columns=a,b (lista explícita) ou
+    column_set=basic|financial|full; sem parâmetros retorna todas (None)
+    """
+    columns = [column.strip() for column in request.args.get('columns', '').split(',') if column.strip()]
+    return resolve_columns(card, column_set=request.args.get('column_set'), columns=columns)
+
+def preview_response(card):
+    """
+    Página da prévia a partir dos parâmetros da requisição
+    page_size (máx. PREVIEW_MAX_PAGE_SIZE), cursor (next_cursor da página
+    anterior) e colunas (column_set / columns, ver requested_columns)
+    """
+    date_filter = request.args.get('date')
+    consolidated = request.args.get('consolidated', 'false').lower() == 'true'
+    page_size = request.args.get('page_size', PREVIEW_LIMIT, type=int)
+    if not page_size or page_size < 1:
+        raise ValueError('page_size deve ser um inteiro positivo')
+    page_size = min(page_size, PREVIEW_MAX_PAGE_SIZE)
+    columns = requested_columns(card)
+    
+    with db.engine.connect() as conn:
+        page = fetch_preview_page(
+            conn, card, date_filter=date_filter, consolidated=consolidated,
+            page_size=page_size, cursor=request.args.get('cursor'), columns=columns
+        )
+    return period_json(page, date_filter=date_filter, consolidated=consolidated)
+
+@dashboard_bp.route('/api/dashboard/preview/<card_name>', methods=['GET'])
+@jwt_required()
+def get_preview_page(card_name):
+    """
+    Prévia paginada da lista detalhada do card (paginação por chave, sem OFFSET)
+    """
+    try:
+        card = get_card(card_name)
+        if card is None:
+            return jsonify({'error': 'Nenhum dado encontrado'}), 404
+        return preview_response(card)
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Erro em get_preview_page para {card_name}: {str(e)}")
+        return jsonify({'error': f'Erro ao buscar prévia do card {card_name}'}), 500
+
+def artifact_response(path, filename, mimetype, etag):
+    """Arquivo do cache de exportações com Content-Length, ETag e suporte a Range"""
+    return send_file(
+        path,
+        as_attachment=True,
+        download_name=filename,
+        mimetype=mimetype,
+        conditional=True,
+        etag=etag
+    )
 
 @dashboard_bp.route('/api/dashboard/export/<card_name>', methods=['GET'])
 @jwt_required()
 def export_card_data(card_name):
     """
-    Endpoint para exportar listas detalhadas em Excel ou retornar dados para prévia
+    Endpoint para exportar listas detalhadas ou retornar dados para prévia
+    Formatos (?format=): xlsx (padrão), csv, csv.gz e parquet
+    Colunas: ?column_set=basic|financial|full ou ?columns=a,b
+    CSV é enviado enquanto as linhas são lidas do banco
     """
     try:
         # Parâmetros da requisição
         date_filter = request.args.get('date')
         consolidated = request.args.get('consolidated', 'false').lower() == 'true'
         preview = request.args.get('preview', 'false').lower() == 'true'
+        export_format = request.args.get('format', 'xlsx').lower()
         
-        with db.engine.connect() as conn:
-            query_result = None
-            
-            # CARD: Total de Cadastrados
-            if card_name == 'clientes_cadastrados':
-                if consolidated:
-                    # Query com TODAS as colunas
-                    query = """
-                        SELECT *
-                        FROM public."V_CUSTOMER"
-                        WHERE "data cadastro" IS NOT NULL
-                        ORDER BY "código" ASC
-                    """
-                    
-                    # Adicionar LIMIT apenas para prévia
-                    if preview:
-                        query += " LIMIT 50"
-                    
-                    query_result = conn.execute(text(query))
-                    
-                else:
-                    if date_filter:
-                        year, month = date_filter.split('-')
-                        date_format = f"{month}/{year}"
-                        
-                        # Query com TODAS as colunas
-                        query = """
-                            SELECT *
-                            FROM public."V_CUSTOMER"
-                            WHERE to_char("data cadastro", 'MM/YYYY') = :date_format
-                            ORDER BY "código" ASC
-                        """
-                        
-                        # Adicionar LIMIT apenas para prévia
-                        if preview:
-                            query += " LIMIT 50"
-                        
-                        query_result = conn.execute(text(query), {'date_format': date_format})
-                    else:
-                        return jsonify({'error': 'Filtro de data é obrigatório para consulta não consolidada'}), 400
-            
-            # Card: Total de Ativações
-            elif card_name == 'total_ativacoes':
-                if consolidated:
-                    # Query com TODAS as colunas
-                    query = """
-                        SELECT *
-                        FROM public."V_CUSTOMER"
-                        WHERE "data ativo" IS NOT NULL
-                        ORDER BY "código" ASC
-                    """
-                    
-                    # Adicionar LIMIT apenas para prévia
-                    if preview:
-                        query += " LIMIT 50"
-                    
-                    query_result = conn.execute(text(query))
-                else:
-                    if date_filter:
-                        year, month = date_filter.split('-')
-                        date_format = f"{month}/{year}"
-                        
-                        # Query com TODAS as colunas
-                        query = """
-                            SELECT *
-                            FROM public."V_CUSTOMER"
-                            WHERE to_char("data ativo", 'MM/YYYY') = :date_format
-                            ORDER BY "código" ASC
-                        """
-                        
-                        # Adicionar LIMIT apenas para prévia
-                        if preview:
-                            query += " LIMIT 50"
-                        
-                        query_result = conn.execute(text(query), {'date_format': date_format})
-                    else:
-                        return jsonify({'error': 'Filtro de data é obrigatório para consulta não consolidada'}), 400
-            
-            if query_result is None:
-                return jsonify({'error': 'Nenhum dado encontrado'}), 404
-            
-            # Se for uma requisição de prévia, retornar dados em formato especial
-            if preview:
-                # Enviar colunas e dados separadamente
-                columns = list(query_result.keys())
-                rows = query_result.fetchall()
-                
-                # Converter dados para arrays (preserva ordem)
-                data_rows = []
-                for row in rows:
-                    row_array = []
-                    for i, value in enumerate(row):
-                        row_array.append(value if value is not None else '')
-                    data_rows.append(row_array)
-                
-                return jsonify({
-                    'columns': columns,  # Array ordenado com nomes das colunas
-                    'rows': data_rows,   # Array de arrays com os dados
-                    'count': len(data_rows)
-                }), 200
-            
-            # Para exportação Excel, usar mesma lógica
-            rows = query_result.fetchall()
-            if not rows:
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f'Formato inválido: {export_format}'}), 400
+        
+        card = get_card(card_name)
+        if card is None:
+            return jsonify({'error': 'Nenhum dado encontrado'}), 404
+        
+        # Se for uma requisição de prévia, retornar a primeira página
+        if preview:
+            return preview_response(card)
+        
+        # Query apenas com as colunas pedidas (todas se não informadas)
+        columns = requested_columns(card)
+        query, params = build_export_query(
+            card, date_filter=date_filter, consolidated=consolidated, columns=columns
+        )
+        
+        suffix, mimetype = EXPORT_FORMATS[export_format]
+        filename = export_filename(card_name, export_format, date_filter, consolidated)
+        
+        # Mês fechado: arquivo reaproveitado do cache em disco enquanto os
+        # dados do mês (valor do card) não mudarem
+        artifact_key = None
+        if export_store.enabled and not consolidated and is_closed_month(date_filter):
+            watermark = fetch_card(card, date_filter=date_filter)['value']
+            artifact_key = export_store.key(card, date_filter, export_format, watermark, columns)
+            cached_path = export_store.get(artifact_key, export_format)
+            if cached_path:
+                return artifact_response(cached_path, filename, mimetype, artifact_key)
+        
+        # Leitura em lotes (cursor no servidor); no CSV a conexão fica
+        # com a resposta em streaming e é fechada ao final dela
+        conn = db.engine.connect()
+        streaming = False
+        try:
+            column_names, batches = stream_query(conn, query, params)
+            first_batch = next(batches, None)
+            if not first_batch:
                 return jsonify({'error': 'Nenhum registro encontrado'}), 404
+            batches = chain([first_batch], batches)
             
-            # Obter nomes das colunas na ordem original
-            column_names = list(query_result.keys())
-            
-            wb = Workbook()
-            ws = wb.active
-            sheet_name = 'Consolidado' if consolidated else date_filter.replace('-', '_')
-            ws.title = sheet_name
-            
-            # Escrever cabeçalhos na ordem original
-            for col_idx, header in enumerate(column_names, 1):
-                ws.cell(row=1, column=col_idx, value=str(header))
-            
-            # Escrever dados
-            for row_idx, row_data in enumerate(rows, 2):
-                for col_idx, cell_value in enumerate(row_data, 1):
-                    try:
-                        safe_value = safe_excel_value(cell_value)
-                        ws.cell(row=row_idx, column=col_idx, value=safe_value)
-                    except Exception as cell_error:
-                        ws.cell(row=row_idx, column=col_idx, value='')
+            if export_format in STREAMED_FORMATS and artifact_key is None:
+                streaming = True
+                return csv_response(
+                    conn, column_names, batches, filename,
+                    compress=export_format == 'csv.gz'
+                )
             
-            # Ajustar largura das colunas
-            for column_cells in ws.columns:
-                length = max(len(str(cell.value or '')) for cell in column_cells)
-                ws.column_dimensions[get_column_letter(column_cells[0].column)].width = min(length + 2, 50)
-            
-            # Salvar Excel
-            excel_buffer = io.BytesIO()
-            wb.save(excel_buffer)
-            excel_buffer.seek(0)
-            
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            period = 'consolidado' if consolidated else date_filter.replace('-', '')
-            filename = f"{card_name}_{period}_{timestamp}.xlsx"
-            
-            return send_file(
-                excel_buffer,
-                as_attachment=True,
-                download_name=filename,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
+            # Excel, Parquet e arquivos para o cache: gravação incremental em disco
+            # (os do cache já no diretório do cache, para o put não copiar entre discos)
+            if artifact_key is not None:
+                export_path = export_store.temporary_path(suffix)
+            else:
+                export_path = temporary_export_path(suffix)
+            try:
+                write_export_file(
+                    export_path, export_format, column_names, batches,
+                    sheet_name=export_sheet_name(date_filter, consolidated)
+                )
+            except Exception:
+                remove_file(export_path)
+                raise
+        finally:
+            if not streaming:
+                conn.close()
+        
+        if artifact_key is not None:
+            try:
+                cached_path = export_store.put(artifact_key, export_format, export_path)
+            except Exception:
+                remove_file(export_path)
+                raise
+            return artifact_response(cached_path, filename, mimetype, artifact_key)
+        
+        # Arquivo enviado em blocos a partir do disco e removido ao final da resposta
+        return temporary_file_response(export_path, filename, mimetype)
             
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Erro geral em export_card_data para {card_name}: {str(e)}")
         print(f"Traceback: {traceback.format_exc()}")
         return jsonify({'error': f'Erro ao exportar dados: {str(e)}'}), 500
-
-# ========================================
-# FUNÇÕES AUXILIARES
-# ========================================
-
-def format_response_data(data, decimal_fields=None):
-    """Formata dados da resposta convertendo Decimal para float"""
-    if decimal_fields is None:
-        decimal_fields = []
-    
-    if isinstance(data, list):
-        return [format_response_data(item, decimal_fields) for item in data]
-    elif isinstance(data, dict):
-        formatted = {}
-        for key, value in data.items():
-            if key in decimal_fields and isinstance(value, Decimal):
-                formatted[key] = decimal_to_float(value)
-            elif isinstance(value, (dict, list)):
-                formatted[key] = format_response_data(value, decimal_fields)
-            else:
-                formatted[key] = decimal_to_float(value) if isinstance(value, Decimal) else value
-        return formatted
-    else:
-        return decimal_to_float(data) if isinstance(value, Decimal) else data
\ No newline at end of file
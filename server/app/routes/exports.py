@@ -0,0 +1,83 @@
+from flask import Blueprint, jsonify, request, send_file
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.card_registry import get_card
+from app.services.card_engine import resolve_columns
+from app.services.exports import EXPORT_FORMATS
+from app.services.export_jobs import (
+    export_jobs, ExportQueueFull, ExportUserLimit, DONE
+)
+
+exports_bp = Blueprint('exports', __name__)
+
+# ========================================
+# EXPORTAÇÕES EM SEGUNDO PLANO
+# ========================================
+
+@exports_bp.route('', methods=['POST'])
+@jwt_required()
+def create_export():
+    """
+    Enfileira uma exportação
+    Body: {"card": "...", "date": "YYYY-MM", "consolidated": false, "format": "xlsx",
+           "column_set": "basic", "columns": ["código", ...]}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        card = get_card(data.get('card'))
+        if card is None:
+            return jsonify({'error': 'Card não encontrado'}), 404
+
+        consolidated = data.get('consolidated', False)
+        if isinstance(consolidated, str):
+            consolidated = consolidated.lower() == 'true'
+
+        job = export_jobs.submit(
+            get_jwt_identity(),
+            card,
+            date_filter=data.get('date'),
+            consolidated=bool(consolidated),
+            export_format=(data.get('format') or 'xlsx').lower(),
+            columns=resolve_columns(card, column_set=data.get('column_set'), columns=data.get('columns'))
+        )
+        return jsonify(job.to_dict()), 202
+
+    except (ExportQueueFull, ExportUserLimit) as e:
+        return jsonify({'error': str(e)}), 429
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Erro em create_export: {str(e)}")
+        return jsonify({'error': 'Erro ao criar exportação'}), 500
+
+@exports_bp.route('', methods=['GET'])
+@jwt_required()
+def list_exports():
+    """Lista as exportações do usuário"""
+    jobs = export_jobs.list(get_jwt_identity())
+    return jsonify([job.to_dict() for job in jobs]), 200
+
+@exports_bp.route('/<job_id>', methods=['GET'])
+@jwt_required()
+def get_export(job_id):
+    """Status, progresso e quantidade de linhas da exportação"""
+    job = export_jobs.get(job_id, user_id=get_jwt_identity())
+    if job is None:
+        return jsonify({'error': 'Exportação não encontrada'}), 404
+    return jsonify(job.to_dict()), 200
+
+@exports_bp.route('/<job_id>/download', methods=['GET'])
+@jwt_required()
+def download_export(job_id):
+    """Download do arquivo gerado"""
+    job = export_jobs.get(job_id, user_id=get_jwt_identity())
+    if job is None:
+        return jsonify({'error': 'Exportação não encontrada'}), 404
+    if job.status != DONE:
+        return jsonify({'error': 'Exportação ainda não concluída', 'status': job.status}), 409
+
+    return send_file(
+        job.path,
+        as_attachment=True,
+        download_name=job.filename,
+        mimetype=EXPORT_FORMATS[job.format][1]
+    )
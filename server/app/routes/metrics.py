@@ -0,0 +1,97 @@
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from app.services.metrics import (
+    MAX_LIMIT, MAX_MONTHS, current_month_filter, dashboard_kpis, dashboard_metrics,
+    fetch_chart, get_chart
+)
+from app.services.live_feed import issue_ticket, live_feed, verify_ticket
+from app.services.circuit_breaker import CircuitOpen
+from app.services.single_flight import SingleFlightTimeout
+from app.utils.http_cache import period_json
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# ========================================
+# MÉTRICAS, KPIs E GRÁFICOS DO DASHBOARD
+# ========================================
+
+@metrics_bp.route('/api/dashboard/metrics', methods=['GET'])
+@jwt_required()
+def get_metrics():
+    """Métricas principais do mês atual"""
+    try:
+        return period_json(dashboard_metrics(), date_filter=current_month_filter())
+    except (SingleFlightTimeout, CircuitOpen) as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        print(f"Erro em get_metrics: {str(e)}")
+        return jsonify({'error': 'Erro ao buscar métricas'}), 500
+
+@metrics_bp.route('/api/dashboard/kpis', methods=['GET'])
+@jwt_required()
+def get_kpis():
+    """KPIs do mês atual com variação em relação ao mês anterior"""
+    try:
+        return period_json(dashboard_kpis(), date_filter=current_month_filter())
+    except (SingleFlightTimeout, CircuitOpen) as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        print(f"Erro em get_kpis: {str(e)}")
+        return jsonify({'error': 'Erro ao buscar KPIs'}), 500
+
+@metrics_bp.route('/api/dashboard/chart/<chart_name>', methods=['GET'])
+@jwt_required()
+def get_chart_data(chart_name):
+    """
+    Dados de gráfico: consumo-mensal (?months=6), faturamento-evolucao,
+    distribuicao-regional e top-clientes (?limit=10)
+    """
+    try:
+        chart = get_chart(chart_name)
+        if chart is None:
+            return jsonify({'error': 'Gráfico não encontrado'}), 404
+        
+        months = request.args.get('months', 6, type=int)
+        limit = request.args.get('limit', 10, type=int)
+        if not months or months < 1 or not limit or limit < 1:
+            return jsonify({'error': 'months e limit devem ser inteiros positivos'}), 400
+        
+        points = fetch_chart(chart, months=min(months, MAX_MONTHS), limit=min(limit, MAX_LIMIT))
+        return period_json(points, date_filter=current_month_filter())
+    except (SingleFlightTimeout, CircuitOpen) as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        print(f"Erro em get_chart_data para {chart_name}: {str(e)}")
+        return jsonify({'error': f'Erro ao buscar dados do gráfico {chart_name}'}), 500
+
+@metrics_bp.route('/api/dashboard/stream/ticket', methods=['POST'])
+@jwt_required()
+def stream_ticket():
+    """Ticket de curta duração para abrir o stream (EventSource não envia cabeçalhos)"""
+    return jsonify({
+        'ticket': issue_ticket(get_jwt_identity()),
+        'expires_in': current_app.config.get('LIVE_FEED_TICKET_TTL', 60)
+    }), 200
+
+@metrics_bp.route('/api/dashboard/stream', methods=['GET'])
+def stream_dashboard():
+    """
+    Feed SSE para o dashboard de TV: 'snapshot' ao conectar, depois 'update'
+    apenas com os valores alterados e heartbeats entre as atualizações
+    Autenticado pelo ticket de /api/dashboard/stream/ticket em ?ticket=
+    """
+    if verify_ticket(request.args.get('ticket')) is None:
+        return jsonify({'error': 'Ticket inválido ou expirado'}), 401
+    
+    try:
+        events, release = live_feed.subscribe()
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+    
+    response = Response(events, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Libera a vaga mesmo se a resposta for fechada antes de ser iterada
+    response.call_on_close(release)
+    return response
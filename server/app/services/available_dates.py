@@ -0,0 +1,123 @@
+"""
+Lista de meses disponíveis para o filtro do dashboard
+A lista fica em memória e só é estendida quando a marca d'água
+(max("data cadastro")) indica um mês novo, lendo apenas esse intervalo
+"""
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+
+from dateutil.relativedelta import relativedelta
+from flask import current_app
+from sqlalchemy import text
+
+from app import db
+from app.services.period import MONTH_EXPRESSION, Period, quote_column, range_predicate
+
+SOURCE = 'public."V_CUSTOMER"'
+DATE_COLUMN = 'data cadastro'
+
+
+def _month_start(value):
+    """Normaliza date/datetime/texto (YYYY-MM...) para o primeiro dia do mês"""
+    if isinstance(value, str):
+        return datetime.strptime(value[:7], '%Y-%m')
+    return datetime(value.year, value.month, 1)
+
+
+class AvailableDatesCache:
+    """Meses com dados, mantidos de forma incremental a partir da marca d'água"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.months = None
+        self.watermark = None
+        self.checked_at = 0
+        self.requested_at = 0
+        self.built_at = 0
+        self.payload = []
+        self.etag = None
+
+    def load_months(self, conn, since=None):
+        """Meses distintos com registros (a partir de since, se informado)"""
+        period = Period(since, None) if since else Period.consolidated()
+        where, params = range_predicate(DATE_COLUMN, period, prefix='dates')
+        month = MONTH_EXPRESSION.format(column=quote_column(DATE_COLUMN))
+        result = conn.execute(text(f"""
+            SELECT DISTINCT {month} AS mes
+            FROM {SOURCE}
+            WHERE {where}
+        """), params)
+        return {_month_start(row[0]) for row in result if row[0] is not None}
+
+    def load_watermark(self, conn):
+        """Consulta barata (usa índice) da data mais recente"""
+        column = quote_column(DATE_COLUMN)
+        return conn.execute(text(f"SELECT MAX({column}) FROM {SOURCE}")).scalar()
+
+    def refresh(self, force=False):
+        """
+        Confere a marca d'água e estende a lista se surgiu um mês novo
+        A cada AVAILABLE_DATES_MAX_AGE a lista é recalculada por completo
+        """
+        now = time.monotonic()
+        max_age = current_app.config.get('AVAILABLE_DATES_MAX_AGE', 86400)
+
+        with db.engine.connect() as conn:
+            watermark = self.load_watermark(conn)
+            if force or self.months is None or now - self.built_at >= max_age:
+                months = self.load_months(conn)
+                self.built_at = now
+            else:
+                months = set(self.months)
+                if watermark is not None and (
+                    self.watermark is None or _month_start(watermark) > _month_start(self.watermark)
+                ):
+                    since = _month_start(self.watermark) + relativedelta(months=1) if self.watermark else None
+                    months |= self.load_months(conn, since=since)
+
+        self.months = months
+        self.watermark = watermark
+        self.checked_at = now
+        self.payload = [
+            {'label': month.strftime('%m/%Y'), 'value': month.strftime('%Y-%m')}
+            for month in sorted(months, reverse=True)
+        ]
+        self.etag = hashlib.sha1(json.dumps(self.payload).encode('utf-8')).hexdigest()
+
+    def needs_revalidation(self, horizon):
+        """
+        Indica se vale pré-aquecer: a lista já foi carregada, foi pedida desde a
+        última conferência e expira (AVAILABLE_DATES_CHECK_INTERVAL) em até horizon segundos
+        """
+        if self.months is None or self.requested_at < self.checked_at:
+            return False
+        interval = current_app.config.get('AVAILABLE_DATES_CHECK_INTERVAL', 60)
+        return self.checked_at + interval - time.monotonic() <= horizon
+
+    def revalidate(self):
+        """Confere a marca d'água agora (usado pelo pré-aquecimento)"""
+        with self._lock:
+            self.refresh()
+
+    def get(self):
+        """
+        Retorna (lista de meses, etag)
+        A marca d'água é consultada no máximo a cada AVAILABLE_DATES_CHECK_INTERVAL
+        """
+        interval = current_app.config.get('AVAILABLE_DATES_CHECK_INTERVAL', 60)
+        self.requested_at = time.monotonic()
+        if self.months is None or time.monotonic() - self.checked_at >= interval:
+            with self._lock:
+                # Outra thread pode ter atualizado enquanto esperávamos o lock
+                if self.months is None or time.monotonic() - self.checked_at >= interval:
+                    self.refresh()
+        return self.payload, self.etag
+
+
+available_dates_cache = AvailableDatesCache()
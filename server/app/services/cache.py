@@ -0,0 +1,86 @@
+"""
+Cache em memória (LRU + TTL) para resultados calculados no processo
+Seguro para uso entre threads do mesmo worker
+"""
+import threading
+import time
+from collections import OrderedDict
+
+# Marca o uso do TTL padrão em TTLCache.set
+DEFAULT_TTL = object()
+
+
+class TTLCache:
+    """
+    Cache LRU limitado por quantidade de entradas, com TTL por entrada
+    ttl=None grava a entrada sem expiração (só sai por LRU ou invalidação)
+    """
+
+    def __init__(self, maxsize=1024, default_ttl=60, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, maxsize=None, default_ttl=None):
+        """Ajusta limites a partir da configuração da aplicação"""
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if default_ttl is not None:
+                self.default_ttl = default_ttl
+            self._evict()
+
+    def get(self, key, default=None):
+        """Retorna o valor em cache ou default se ausente/expirado"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=DEFAULT_TTL):
+        """Grava o valor; sem ttl usa o TTL padrão e ttl=None não expira"""
+        if ttl is DEFAULT_TTL:
+            ttl = self.default_ttl
+        expires_at = None if ttl is None else self._clock() + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            self._evict()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Contadores de acerto/erro para monitoramento"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / total, 4) if total else None
+            }
+
+    def _evict(self):
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,548 @@
+"""
+Motor de cálculo dos cards do dashboard
+Monta as queries de valor, comparação e exportação a partir das
+definições do card_registry e calcula valor atual, mês anterior e
+valores proporcionais em uma única query
+"""
+import base64
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app, g, has_request_context
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.services.cache import TTLCache
+from app.services.circuit_breaker import CircuitOpen, db_breaker, set_statement_timeout
+from app.services.hot_keys import hot_keys
+from app.services.rollup import RollupUnavailable, sum_card_periods
+from app.services.schema_catalog import schema_catalog, source_columns
+from app.services.single_flight import SingleFlightTimeout, single_flight
+from app.services.period import (
+    Period, month_period, previous_month_period, proportional_period,
+    is_current_month, is_closed_month, quote_column, range_predicate
+)
+
+logger = logging.getLogger(__name__)
+
+# Cache dos resultados dos cards (limites ajustados em init_card_cache)
+card_cache = TTLCache(maxsize=2048, default_ttl=60)
+
+# Último valor bom de cada card, servido como stale quando o banco está
+# lento ou indisponível (TTL em CARD_STALE_MAX_AGE)
+stale_cache = TTLCache(maxsize=2048, default_ttl=86400)
+
+# Recálculos que continuam em segundo plano enquanto o valor stale é servido
+refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='card-refresh')
+
+# Erros do banco que fazem servir o último valor bom em vez de falhar
+STALE_ERRORS = (SQLAlchemyError, CircuitOpen, SingleFlightTimeout)
+
+
+def init_card_cache(app):
+    """Aplica a configuração da aplicação ao cache de cards"""
+    card_cache.configure(
+        maxsize=app.config.get('CARD_CACHE_MAXSIZE', 2048),
+        default_ttl=app.config.get('CARD_CACHE_TTL_CURRENT', 60)
+    )
+    stale_cache.configure(
+        maxsize=app.config.get('CARD_CACHE_MAXSIZE', 2048),
+        default_ttl=app.config.get('CARD_STALE_MAX_AGE', 86400)
+    )
+
+
+def mark_stale():
+    """Marca a requisição atual como respondida com dados stale"""
+    if has_request_context():
+        g.data_stale = True
+
+
+def stale_result(value):
+    """Último valor bom do card, marcado como stale"""
+    mark_stale()
+    return {**value, 'stale': True}
+
+
+def calc_variacao(atual, anterior):
+    """Calcula variação percentual entre dois valores"""
+    if anterior and anterior > 0:
+        return round(((atual - anterior) / anterior) * 100, 2)
+    return None
+
+
+def filters_predicate(card, prefix='filter'):
+    """
+    Monta o predicado dos filtros fixos do card
+    Retorna (sql, params); sql vazio quando o card não tem filtros
+    """
+    clauses = []
+    params = {}
+    for index, (column, value) in enumerate(sorted(card.filters.items())):
+        if value is None:
+            clauses.append(f"{quote_column(column)} IS NULL")
+        else:
+            clauses.append(f"{quote_column(column)} = :{prefix}_{index}")
+            params[f"{prefix}_{index}"] = value
+    return ' AND '.join(clauses), params
+
+
+def card_where(card, period, prefix='period'):
+    """Predicado completo do card: período na coluna de data + filtros fixos"""
+    where, params = range_predicate(card.date_column, period, prefix=prefix)
+    filters_sql, filters_params = filters_predicate(card, prefix=f"{prefix}_filter")
+    if filters_sql:
+        where = f"{where} AND {filters_sql}"
+        params.update(filters_params)
+    return where, params
+
+
+def card_period(date_filter=None, consolidated=False):
+    """
+    Converte os parâmetros da requisição no período do card
+    Lança ValueError quando falta o filtro de data no modo não consolidado
+    """
+    if consolidated:
+        return Period.consolidated()
+    if not date_filter:
+        raise ValueError('Filtro de data é obrigatório para consulta não consolidada')
+    return month_period(date_filter)
+
+
+def comparison_periods(date_filter=None, consolidated=False, now=None):
+    """
+    Períodos calculados para um card, como lista de (nome, Period)
+    Mês fechado: total do mês e do mês anterior
+    Mês atual: também os proporcionais (até hoje vs mesmo dia do mês anterior)
+    Consolidado: apenas o total
+    """
+    if consolidated:
+        return [('current_total', Period.consolidated())]
+
+    now = now or datetime.now()
+    current = month_period(date_filter)
+    previous = previous_month_period(date_filter)
+
+    periods = [('current_total', current), ('previous_total', previous)]
+    if is_current_month(date_filter, now):
+        periods += [
+            ('previous_proportional', proportional_period(previous, now.day)),
+            ('current_proportional', proportional_period(current, now.day)),
+        ]
+    return periods
+
+
+def scan_period(date_filter=None, consolidated=False):
+    """Intervalo lido do banco: cobre o mês anterior e o mês selecionado"""
+    if consolidated:
+        return Period.consolidated()
+    return Period(previous_month_period(date_filter).start, month_period(date_filter).end)
+
+
+def build_cards_query(cards, date_filter=None, consolidated=False, now=None):
+    """
+    Monta uma única query para um ou mais cards da mesma view de origem
+    Cada valor é um AGG(...) FILTER (WHERE ...) sobre o intervalo que cobre
+    o mês anterior e o mês atual, evitando uma ida ao banco por comparação
+    As colunas retornadas são nomeadas c<índice>_<período>
+    Retorna (sql, params)
+    """
+    sources = {card.source for card in cards}
+    if len(sources) != 1:
+        raise ValueError('Cards combinados devem usar a mesma view de origem')
+
+    periods = comparison_periods(date_filter, consolidated, now)
+    scan = scan_period(date_filter, consolidated)
+
+    columns = []
+    scans = {}
+    params = {}
+    for index, card in enumerate(cards):
+        for name, period in periods:
+            alias = f"c{index}_{name}"
+            where, period_params = card_where(card, period, prefix=alias)
+            columns.append(f"{card.aggregate} FILTER (WHERE {where}) AS {alias}")
+            params.update(period_params)
+
+        # Cards com mesma coluna de data e filtros compartilham o predicado de leitura
+        where, scan_params = card_where(card, scan, prefix=f"c{index}_scan")
+        key = (card.date_column, tuple(sorted(card.filters.items(), key=repr)))
+        if key not in scans:
+            scans[key] = where
+            params.update(scan_params)
+
+    if len(scans) == 1:
+        where = next(iter(scans.values()))
+    else:
+        where = ' OR '.join(f"({scan_where})" for scan_where in scans.values())
+
+    sql = f"""
+        SELECT {', '.join(columns)}
+        FROM {sources.pop()}
+        WHERE {where}
+    """
+    return sql, params
+
+
+def card_column_sets(card):
+    """Conjuntos de colunas do card, incluindo os definidos em CARD_COLUMN_SETS"""
+    configured = current_app.config.get('CARD_COLUMN_SETS', {}).get(card.name, {})
+    return {**card.column_sets, **configured}
+
+
+def resolve_columns(card, column_set=None, columns=None):
+    """
+    Colunas da prévia/exportação a partir de columns (lista explícita) ou
+    column_set (nome do conjunto); None significa todas as colunas
+    As colunas são validadas no catálogo da view de origem
+    Lança ValueError para conjunto ou colunas desconhecidos
+    """
+    if isinstance(columns, str):
+        columns = [column.strip() for column in columns.split(',') if column.strip()]
+    if columns:
+        selected = list(columns)
+    elif column_set and column_set != 'full':
+        sets = card_column_sets(card)
+        if column_set not in sets:
+            available = ', '.join(sorted(sets) + ['full'])
+            raise ValueError(f'Conjunto de colunas inválido: {column_set} (disponíveis: {available})')
+        selected = list(sets[column_set])
+    else:
+        return None
+
+    available = set(source_columns(card.source))
+    invalid = [column for column in selected if column not in available]
+    if invalid:
+        raise ValueError(f'Colunas inválidas para o card {card.name}: {", ".join(invalid)}')
+    # Remove repetições mantendo a ordem pedida
+    return list(dict.fromkeys(selected))
+
+
+def select_list(columns=None):
+    """Lista do SELECT: colunas projetadas ou todas"""
+    if not columns:
+        return '*'
+    return ', '.join(quote_column(column) for column in columns)
+
+
+def build_export_query(card, date_filter=None, consolidated=False, limit=None, columns=None):
+    """
+    Monta a query da lista detalhada do card (exportação e prévia)
+    columns: colunas projetadas (resolve_columns); None lê todas
+    Retorna (sql, params)
+    """
+    where, params = card_where(card, card_period(date_filter, consolidated))
+    sql = f"""
+        SELECT {select_list(columns)}
+        FROM {card.source}
+        WHERE {where}
+        ORDER BY {quote_column(card.order_by)} ASC
+    """
+    if limit:
+        sql += " LIMIT :limit"
+        params['limit'] = int(limit)
+    return sql, params
+
+
+def encode_cursor(value):
+    """Cursor opaco da paginação (valor da chave da última linha)"""
+    payload = json.dumps(value, default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Valor da chave a partir do cursor; lança ValueError se inválido"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError('Cursor de paginação inválido')
+
+
+def build_preview_query(card, date_filter=None, consolidated=False, page_size=50,
+                        after=None, columns=None):
+    """
+    Monta a query de uma página da prévia com paginação por chave (keyset)
+    na coluna de ordenação do card, sem OFFSET: cada página é uma leitura
+    por faixa do índice a partir da última chave vista
+    Busca page_size + 1 linhas para saber se existe próxima página
+    Retorna (sql, params)
+    """
+    where, params = card_where(card, card_period(date_filter, consolidated))
+    key = quote_column(card.order_by)
+    if after is not None:
+        where = f"{where} AND {key} > :cursor"
+        params['cursor'] = after
+
+    # A chave é sempre retornada para calcular o próximo cursor
+    if columns and card.order_by not in columns:
+        columns = [card.order_by] + list(columns)
+
+    sql = f"""
+        SELECT {select_list(columns)}
+        FROM {card.source}
+        WHERE {where}
+        ORDER BY {key} ASC
+        LIMIT :limit
+    """
+    params['limit'] = int(page_size) + 1
+    return sql, params
+
+
+def fetch_preview_page(conn, card, date_filter=None, consolidated=False, page_size=50,
+                       cursor=None, columns=None):
+    """
+    Uma página da prévia: {'columns', 'rows', 'count', 'next_cursor'}
+    """
+    after = decode_cursor(cursor) if cursor else None
+    sql, params = build_preview_query(
+        card, date_filter, consolidated, page_size=page_size, after=after, columns=columns
+    )
+    result = conn.execute(text(sql), params)
+    column_names = list(result.keys())
+    rows = result.fetchall()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    key_index = column_names.index(card.order_by)
+    next_cursor = encode_cursor(rows[-1][key_index]) if has_more and rows else None
+
+    return {
+        'columns': column_names,  # Array ordenado com nomes das colunas
+        'rows': rows,  # Linhas do banco serializadas direto pelo provider JSON
+        'count': len(rows),
+        'next_cursor': next_cursor
+    }
+
+
+def unavailable_result():
+    """Resultado padrão de card inexistente ou sem filtro de data"""
+    return {'value': 0, 'available': False, 'change': None}
+
+
+def card_result(values, consolidated=False):
+    """
+    Converte a linha agregada no resultado {'value', 'available', 'change'}
+    """
+    values = {key: (value or 0) for key, value in values.items()}
+    current_value = values.get('current_total', 0)
+
+    if consolidated:
+        change = None  # Sem variação no modo consolidado
+    elif 'current_proportional' in values:
+        change = calc_variacao(values['current_proportional'], values['previous_proportional'])
+    else:
+        # Mês fechado: comparar total vs total
+        change = calc_variacao(current_value, values.get('previous_total', 0))
+
+    return {
+        'value': current_value,
+        'available': True,
+        'change': change
+    }
+
+
+def compute_cards(conn, cards, date_filter=None, consolidated=False):
+    """
+    Calcula vários cards de uma vez, com uma query por view de origem
+    Retorna {nome_do_card: {'value', 'available', 'change'}}
+    """
+    if not consolidated and not date_filter:
+        return {card.name: unavailable_result() for card in cards}
+
+    by_source = {}
+    for card in cards:
+        by_source.setdefault(card.source, []).append(card)
+
+    results = {}
+    for source_cards in by_source.values():
+        sql, params = build_cards_query(source_cards, date_filter, consolidated)
+        row = conn.execute(text(sql), params).mappings().fetchone()
+        row = dict(row) if row else {}
+        for index, card in enumerate(source_cards):
+            prefix = f"c{index}_"
+            values = {key[len(prefix):]: value for key, value in row.items() if key.startswith(prefix)}
+            results[card.name] = card_result(values, consolidated)
+    return results
+
+
+def compute_card(conn, card, date_filter=None, consolidated=False):
+    """
+    Calcula o resultado de um card no formato {'value', 'available', 'change'}
+    """
+    return compute_cards(conn, [card], date_filter, consolidated)[card.name]
+
+
+# ========================================
+# LEITURA COM CACHE
+# ========================================
+
+def card_cache_key(card, date_filter=None, consolidated=False):
+    """Chave do cache: card, período, modo consolidado e filtros fixos"""
+    period = 'consolidated' if consolidated else date_filter
+    return (card.name, period, consolidated, tuple(sorted(card.filters.items(), key=repr)))
+
+
+def card_cache_ttl(date_filter=None, consolidated=False, now=None):
+    """
+    TTL do resultado em segundos (None = sem expiração)
+    Mês fechado não muda mais: TTL longo (CARD_CACHE_TTL_CLOSED, 0 = infinito)
+    Mês atual e consolidado: TTL curto (CARD_CACHE_TTL_CURRENT)
+    """
+    config = current_app.config
+    if not consolidated and is_closed_month(date_filter, now):
+        return config.get('CARD_CACHE_TTL_CLOSED', 86400) or None
+    return config.get('CARD_CACHE_TTL_CURRENT', 60)
+
+
+def compute_missing_cards(cards, date_filter=None, consolidated=False):
+    """
+    Calcula os cards pelo rollup diário quando possível e, para os demais,
+    direto na view de origem (uma query por view)
+    """
+    periods = comparison_periods(date_filter, consolidated)
+    computed = {}
+    raw_cards = []
+    for card in cards:
+        try:
+            computed[card.name] = card_result(sum_card_periods(card, periods), consolidated)
+        except RollupUnavailable as e:
+            if e.__cause__ is not None:
+                logger.warning(f"Rollup indisponível, usando a view de origem: {e}")
+            raw_cards.append(card)
+
+    if raw_cards:
+        with db_breaker.guard(), db.engine.connect() as conn:
+            set_statement_timeout(conn, current_app.config.get('CARD_STATEMENT_TIMEOUT', 10000))
+            computed.update(compute_cards(conn, raw_cards, date_filter, consolidated))
+    return computed
+
+
+def card_available(card):
+    """
+    A view e as colunas do card existem no catálogo do banco?
+    Sem catálogo carregado o card é considerado disponível
+    """
+    return not schema_catalog.loaded or schema_catalog.has_columns(card.source, *card.columns)
+
+
+def store_card_result(card, date_filter, consolidated, value):
+    """Guarda o resultado no cache e como último valor bom do card"""
+    key = card_cache_key(card, date_filter, consolidated)
+    card_cache.set(key, value, card_cache_ttl(date_filter, consolidated))
+    stale_cache.set(key, value)
+
+
+def refresh_cards(cards, flights, date_filter, consolidated):
+    """
+    Calcula os cards liderados por esta requisição e entrega o resultado
+    (ou o erro) a quem aguarda no single-flight
+    """
+    try:
+        computed = compute_missing_cards(cards, date_filter, consolidated)
+    except BaseException as e:
+        for card in cards:
+            key, call, _ = flights[card.name]
+            single_flight.fail(key, call, e)
+        raise
+    for card in cards:
+        key, call, _ = flights[card.name]
+        store_card_result(card, date_filter, consolidated, computed[card.name])
+        single_flight.complete(key, call, computed[card.name])
+    return computed
+
+
+def refresh_cards_in_background(app, cards, flights, date_filter, consolidated):
+    with app.app_context():
+        try:
+            refresh_cards(cards, flights, date_filter, consolidated)
+        except Exception as e:
+            logger.warning(f"Erro ao recalcular cards em segundo plano: {e}")
+
+
+def fetch_cards(cards, date_filter=None, consolidated=False):
+    """
+    Retorna os resultados dos cards usando o cache em memória
+    Só abre conexão com o banco para os cards que não estão em cache
+    Cards cuja view/colunas não existem retornam indisponível sem consulta
+    Com o banco lento (mais de CARD_STALE_WAIT segundos) ou indisponível,
+    os cards com valor anterior são servidos com 'stale': True
+    """
+    if not consolidated and not date_filter:
+        return {card.name: unavailable_result() for card in cards}
+    card_period(date_filter, consolidated)  # Valida o filtro antes de consultar o cache
+
+    # Frequência das chaves do período corrente (usada pelo pré-aquecimento)
+    track = consolidated or is_current_month(date_filter)
+
+    results = {}
+    missing = []
+    for card in cards:
+        if not card_available(card):
+            results[card.name] = unavailable_result()
+            continue
+        if track:
+            # No consolidado a data não muda o resultado: uma única chave por card
+            hot_keys.record((card.name, None if consolidated else date_filter, consolidated))
+        cached = card_cache.get(card_cache_key(card, date_filter, consolidated))
+        if cached is None:
+            missing.append(card)
+        else:
+            results[card.name] = cached
+
+    if missing:
+        # Cards já em cálculo por outra requisição são aguardados (single-flight);
+        # os demais são calculados juntos por esta requisição
+        flights = {}
+        for card in missing:
+            key = ('card',) + card_cache_key(card, date_filter, consolidated)
+            flights[card.name] = (key,) + single_flight.begin(key)
+        leading = []
+        for card in missing:
+            key, call, leader = flights[card.name]
+            if not leader:
+                continue
+            # Outra requisição pode ter terminado entre a leitura do cache e o begin
+            cached = card_cache.get(card_cache_key(card, date_filter, consolidated))
+            if cached is None:
+                leading.append(card)
+            else:
+                single_flight.complete(key, call, cached)
+                results[card.name] = cached
+
+        if leading:
+            keys = [card_cache_key(card, date_filter, consolidated) for card in leading]
+            if all(stale_cache.get(key) is not None for key in keys):
+                # Há valor anterior de todos: o recálculo segue em segundo plano
+                # e, se demorar, as requisições recebem o valor stale
+                refresh_executor.submit(
+                    refresh_cards_in_background, current_app._get_current_object(),
+                    leading, flights, date_filter, consolidated
+                )
+            else:
+                try:
+                    refresh_cards(leading, flights, date_filter, consolidated)
+                except Exception:
+                    pass  # O erro é entregue pelo single_flight.wait abaixo
+
+        stale_wait = current_app.config.get('CARD_STALE_WAIT', 2)
+        for card in missing:
+            if card.name in results:
+                continue
+            key, call, leader = flights[card.name]
+            stale = stale_cache.get(card_cache_key(card, date_filter, consolidated))
+            try:
+                results[card.name] = single_flight.wait(call, stale_wait if stale is not None else None)
+            except STALE_ERRORS as e:
+                if stale is None:
+                    raise
+                logger.warning(f"Card {card.name} servido stale: {e or type(e).__name__}")
+                results[card.name] = stale_result(stale)
+
+    return results
+
+
+def fetch_card(card, date_filter=None, consolidated=False):
+    """Resultado de um único card usando o cache em memória"""
+    return fetch_cards([card], date_filter, consolidated)[card.name]
@@ -0,0 +1,132 @@
+"""
+Registro declarativo dos cards do dashboard
+Cada card é descrito por view de origem, coluna de data, agregação e filtros
+O motor (card_engine) monta as queries de valor, comparação e exportação
+"""
+from flask import current_app
+
+
+class CardDefinition:
+    """
+    Definição de um card
+
+    name: identificador usado nas rotas (/api/dashboard/card/<name>)
+    source: view/tabela de origem já qualificada (ex.: public."V_CUSTOMER")
+    date_column: coluna de data usada nos filtros de período
+    aggregate: expressão de agregação do valor do card
+    filters: filtros fixos {coluna: valor} aplicados a valor e exportação
+    order_by: coluna de ordenação da exportação
+    column_sets: conjuntos nomeados de colunas da exportação {nome: [colunas]};
+        'full' (todas as colunas da view) está sempre disponível
+    requires: outras colunas usadas na agregação (conferidas no catálogo do banco)
+    enabled_by: chave de configuração que precisa estar ligada para o card
+        existir (fontes ainda não confirmadas no banco de origem)
+    """
+
+    def __init__(self, name, source, date_column, aggregate='COUNT(*)',
+                 filters=None, order_by='código', title=None, column_sets=None, requires=None,
+                 enabled_by=None):
+        self.name = name
+        self.source = source
+        self.date_column = date_column
+        self.aggregate = aggregate
+        self.filters = filters or {}
+        self.order_by = order_by
+        self.title = title or name
+        self.column_sets = column_sets or {}
+        self.requires = list(requires or [])
+        self.enabled_by = enabled_by
+
+    @property
+    def columns(self):
+        """Colunas que precisam existir na view para o card ser calculado"""
+        return [self.date_column, *self.requires, *self.filters]
+
+    def __repr__(self):
+        return f"CardDefinition({self.name!r})"
+
+
+CARDS = {}
+
+
+def register_card(card):
+    """Registra um card; nomes duplicados substituem a definição anterior"""
+    CARDS[card.name] = card
+    return card
+
+
+def is_enabled(definition):
+    """A definição (card ou gráfico) está ligada na configuração?"""
+    return not definition.enabled_by or bool(current_app.config.get(definition.enabled_by, False))
+
+
+def get_card(name):
+    """Retorna a definição do card ou None se não existir (ou estiver desligado)"""
+    card = CARDS.get(name)
+    if card is None or not is_enabled(card):
+        return None
+    return card
+
+
+# ========================================
+# CARDS DISPONÍVEIS
+# ========================================
+
+# Conjuntos de colunas dos cards de V_CUSTOMER
+# Outros conjuntos (ex.: 'financial') podem ser definidos em CARD_COLUMN_SETS
+CUSTOMER_COLUMN_SETS = {
+    'basic': ['código', 'data cadastro', 'data ativo'],
+}
+
+register_card(CardDefinition(
+    name='clientes_cadastrados',
+    title='Total de Cadastrados',
+    source='public."V_CUSTOMER"',
+    date_column='data cadastro',
+    column_sets=CUSTOMER_COLUMN_SETS,
+))
+
+register_card(CardDefinition(
+    name='total_ativacoes',
+    title='Total de Ativações',
+    source='public."V_CUSTOMER"',
+    date_column='data ativo',
+    column_sets=CUSTOMER_COLUMN_SETS,
+))
+
+# Cards de consumo e faturamento (adaptar conforme estrutura real)
+# Desligados até as tabelas serem confirmadas (METRICS_CONSUMO_ENABLED /
+# METRICS_FATURAMENTO_ENABLED); ligados, ficam indisponíveis enquanto as
+# tabelas/colunas não existirem no catálogo
+register_card(CardDefinition(
+    name='consumo_kwh',
+    title='Consumo Total (kWh)',
+    source='public.consumo',
+    date_column='data',
+    aggregate='SUM("kwh")',
+    order_by='data',
+    requires=['kwh'],
+    enabled_by='METRICS_CONSUMO_ENABLED',
+))
+
+register_card(CardDefinition(
+    name='consumo_medio',
+    title='Consumo Médio (kWh)',
+    source='public.consumo',
+    date_column='data',
+    aggregate='AVG("kwh")',
+    order_by='data',
+    requires=['kwh'],
+    enabled_by='METRICS_CONSUMO_ENABLED',
+))
+
+register_card(CardDefinition(
+    name='faturamento',
+    title='Faturamento',
+    source='public.faturamento',
+    date_column='data',
+    aggregate='SUM("valor")',
+    order_by='data',
+    requires=['valor'],
+    enabled_by='METRICS_FATURAMENTO_ENABLED',
+))
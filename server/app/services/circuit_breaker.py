@@ -0,0 +1,122 @@
+"""
+Circuit breaker do banco de origem
+Após DB_BREAKER_FAILURES falhas seguidas de conexão/timeout o circuito
+abre e as queries deixam de ser enviadas por DB_BREAKER_RESET_TIMEOUT
+segundos; depois disso uma única query de teste (half-open) decide se o
+circuito fecha novamente ou volta a abrir
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Erros que indicam banco indisponível ou lento (não erros de SQL)
+FAILURE_ERRORS = (OperationalError, PoolTimeoutError, TimeoutError)
+
+# SQLSTATE da query cancelada por statement_timeout (PostgreSQL)
+QUERY_CANCELED = '57014'
+
+
+def is_statement_timeout(error):
+    """O erro é o cancelamento da query pelo statement_timeout?"""
+    return getattr(getattr(error, 'orig', None), 'pgcode', None) == QUERY_CANCELED
+
+
+def set_statement_timeout(conn, timeout_ms):
+    """
+    Limita as queries da transação corrente (SET LOCAL, PostgreSQL) para que
+    um banco lento mas acessível gere erro em vez de prender a thread
+    """
+    if timeout_ms and conn.dialect.name == 'postgresql':
+        conn.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+
+
+class CircuitOpen(Exception):
+    """O circuito está aberto: a query não foi enviada ao banco"""
+
+
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.failure_threshold = app.config.get('DB_BREAKER_FAILURES', 5)
+        self.reset_timeout = app.config.get('DB_BREAKER_RESET_TIMEOUT', 30)
+
+    def allow(self):
+        """A query pode ser enviada? No half-open apenas uma por vez (teste)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info('Banco respondeu novamente: circuito fechado')
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(f"Banco indisponível após {self.failures} falhas: circuito aberto")
+                self.state = OPEN
+                self.opened_at = self.clock()
+
+    @contextmanager
+    def guard(self, count_timeouts=True):
+        """
+        Envolve as queries ao banco: lança CircuitOpen sem consultar se o
+        circuito estiver aberto e registra sucesso/falha ao final
+        count_timeouts=False: query cancelada pelo statement_timeout não
+        conta como falha (orçamento de latência da própria query)
+        """
+        if not self.allow():
+            raise CircuitOpen('Banco de dados indisponível no momento, tente novamente em instantes')
+        try:
+            yield
+        except FAILURE_ERRORS as e:
+            if not count_timeouts and is_statement_timeout(e):
+                # O banco respondeu: apenas cancelou a query pelo orçamento
+                self.record_success()
+            else:
+                self.record_failure()
+            raise
+        except BaseException:
+            # Erro de SQL/aplicação: o banco respondeu
+            self.record_success()
+            raise
+        self.record_success()
+
+    def stats(self):
+        return {'state': self.state, 'failures': self.failures}
+
+
+db_breaker = CircuitBreaker()
@@ -1,149 +1,142 @@
 """
 Serviço para leitura de dados do banco (somente leitura)
 """
-import psycopg2
-import pandas as pd
-from flask import current_app
-import os
-from datetime import datetime, timedelta
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+
+from flask import current_app, g
+from app import db
+
+# Linhas por lote lidas do cursor no servidor
+DEFAULT_BATCH_SIZE = 2000
 
 class DataService:
     @staticmethod
     def get_connection():
-        """Criar conexão com o banco"""
-        return psycopg2.connect(
-            host=os.environ.get('DB_HOST', '162.141.111.95'),
-            port=os.environ.get('DB_PORT', '5432'),
-            database=os.environ.get('DB_NAME', 'IGREEN'),
-            user=os.environ.get('DB_USER', 'bi_igreen'),
-            password=os.environ.get('DB_PASSWORD', 'iGr33n@2025')
-        )
+        """
+        Conexão DBAPI emprestada do pool do SQLAlchemy (db.engine)
+        close() devolve a conexão ao pool; pool_pre_ping e pool_timeout
+        vêm de SQLALCHEMY_ENGINE_OPTIONS
+        """
+        return db.engine.raw_connection()
     
     @staticmethod
-    def execute_query(query, params=None):
-        """Executar query e retornar resultados"""
-        conn = DataService.get_connection()
+    @contextmanager
+    def connection():
+        """
+        Conexão compartilhada por todas as queries do mesmo contexto
+        (requisição), devolvida ao pool no teardown
+        A transação de leitura é encerrada ao final de cada bloco
+        """
+        conn = g.get('data_service_conn')
+        if conn is None:
+            conn = g.data_service_conn = DataService.get_connection()
         try:
-            df = pd.read_sql_query(query, conn, params=params)
-            return df.to_dict('records')
+            yield conn
         finally:
+            conn.rollback()
+    
+    @staticmethod
+    def close_connection(exception=None):
+        """Devolve ao pool a conexão da requisição (teardown_appcontext)"""
+        conn = g.pop('data_service_conn', None)
+        if conn is not None:
             conn.close()
     
     @staticmethod
-    def get_dashboard_metrics():
-        """Buscar métricas do dashboard"""
-        # Queries genéricas que devem funcionar com qualquer estrutura
-        metrics = {
-            'kwhTotal': 1234567,  # Valor default
-            'clientesAtivos': 892,
-            'clientesNovos': 45,
-            'faturamento': 2456789,
-            'consumoMedio': 342,
-            'eficiencia': 94.5,
-            'alertas': 3
-        }
-        
+    def init_app(app):
+        app.teardown_appcontext(DataService.close_connection)
+    
+    @staticmethod
+    def open_cursor(conn, batch_size):
+        """
+        Cursor no servidor (cursor nomeado do psycopg2) que traz batch_size
+        linhas por ida ao banco; drivers sem cursor nomeado usam o comum
+        """
         try:
-            # Tentar buscar dados reais se houver tabelas
-            conn = DataService.get_connection()
+            cursor = conn.cursor(name=f"data_service_{uuid.uuid4().hex}")
+        except TypeError:
             cursor = conn.cursor()
-            
-            # Verificar se existe tabela de clientes
-            cursor.execute("""
-                SELECT COUNT(*) as total 
-                FROM information_schema.tables 
-                WHERE table_name LIKE '%client%' 
-                OR table_name LIKE '%cliente%'
-            """)
-            
-            if cursor.fetchone()[0] > 0:
-                # Temos tabelas, vamos tentar queries
-                try:
-                    cursor.execute("SELECT COUNT(*) FROM public.clientes WHERE ativo = true")
-                    metrics['clientesAtivos'] = cursor.fetchone()[0]
-                except:
-                    pass
-                
-                try:
-                    # Consumo total
-                    cursor.execute("""
-                        SELECT SUM(kwh) 
-                        FROM public.consumo 
-                        WHERE data >= CURRENT_DATE - INTERVAL '30 days'
-                    """)
-                    result = cursor.fetchone()
-                    if result[0]:
-                        metrics['kwhTotal'] = int(result[0])
-                except:
-                    pass
-            
-            cursor.close()
-            conn.close()
-            
-        except Exception as e:
-            print(f"Usando dados mock: {e}")
-        
-        return metrics
+        cursor.arraysize = batch_size
+        if hasattr(cursor, 'itersize'):
+            cursor.itersize = batch_size
+        return cursor
     
     @staticmethod
-    def get_chart_data():
-        """Buscar dados para gráficos"""
-        # Dados padrão
-        data = {
-            'consumoMensal': [
-                {'mes': 'Jan', 'consumo': 420, 'meta': 400},
-                {'mes': 'Fev', 'consumo': 380, 'meta': 400},
-                {'mes': 'Mar', 'consumo': 450, 'meta': 420},
-                {'mes': 'Abr', 'consumo': 490, 'meta': 450},
-                {'mes': 'Mai', 'consumo': 520, 'meta': 480},
-                {'mes': 'Jun', 'consumo': 480, 'meta': 500},
-            ],
-            'dadosRegionais': [
-                {'regiao': 'Norte', 'clientes': 120, 'consumo': 380},
-                {'regiao': 'Nordeste', 'clientes': 280, 'consumo': 720},
-                {'regiao': 'Centro-Oeste', 'clientes': 95, 'consumo': 290},
-                {'regiao': 'Sudeste', 'clientes': 340, 'consumo': 980},
-                {'regiao': 'Sul', 'clientes': 157, 'consumo': 440},
-            ],
-            'distribuicaoTipo': [
-                {'name': 'Residencial', 'value': 45},
-                {'name': 'Comercial', 'value': 35},
-                {'name': 'Industrial', 'value': 20}
-            ]
-        }
-        
+    def stream_query(query, params=None, batch_size=None, as_dict=False):
+        """
+        Gera as linhas da query em lotes (fetchmany) com memória constante
+        as_dict=False gera tuplas; as_dict=True gera dicts {coluna: valor}
+        """
+        batch_size = batch_size or current_app.config.get('DATA_SERVICE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        with DataService.connection() as conn:
+            cursor = DataService.open_cursor(conn, batch_size)
+            try:
+                cursor.execute(query, params)
+                columns = None
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    if not as_dict:
+                        yield from rows
+                        continue
+                    if columns is None:
+                        columns = [description[0] for description in cursor.description]
+                    for row in rows:
+                        yield dict(zip(columns, row))
+            finally:
+                cursor.close()
+    
+    @staticmethod
+    def execute_query(query, params=None):
+        """Executar query e retornar resultados (lista de dicts)"""
+        return list(DataService.stream_query(query, params, as_dict=True))
+    
+    @staticmethod
+    def execute_columns(query, params=None, batch_size=None):
+        """
+        Resultado em colunas: {coluna: numpy.ndarray}, para quem agrega
+        Colunas numéricas (inclusive Decimal) viram float, com NULL como NaN
+        Requer numpy
+        """
         try:
-            # Tentar buscar dados reais se disponível
-            conn = DataService.get_connection()
-            cursor = conn.cursor()
-            
-            # Query exemplo para consumo mensal (adaptar conforme estrutura real)
-            cursor.execute("""
-                SELECT 
-                    EXTRACT(MONTH FROM data) as mes,
-                    SUM(kwh) as consumo
-                FROM public.consumo
-                WHERE data >= CURRENT_DATE - INTERVAL '6 months'
-                GROUP BY EXTRACT(MONTH FROM data)
-                ORDER BY mes
-            """)
-            
-            # Se conseguir dados, usar eles
-            results = cursor.fetchall()
-            if results:
-                meses = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
-                data['consumoMensal'] = []
-                for mes_num, consumo in results:
-                    data['consumoMensal'].append({
-                        'mes': meses[int(mes_num)-1],
-                        'consumo': float(consumo),
-                        'meta': float(consumo) * 0.95
-                    })
-            
-            cursor.close()
-            conn.close()
-            
-        except Exception as e:
-            print(f"Usando dados mock para gráficos: {e}")
+            import numpy as np
+        except ImportError:
+            raise ValueError('Modo colunar indisponível: instale o pacote numpy')
+        
+        batch_size = batch_size or current_app.config.get('DATA_SERVICE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        with DataService.connection() as conn:
+            cursor = DataService.open_cursor(conn, batch_size)
+            try:
+                cursor.execute(query, params)
+                values = None
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    if values is None:
+                        columns = [description[0] for description in cursor.description]
+                        values = [[] for _ in columns]
+                    for index, column_values in enumerate(zip(*rows)):
+                        values[index].extend(column_values)
+                if values is None:
+                    columns = [description[0] for description in cursor.description or []]
+                    values = [[] for _ in columns]
+            finally:
+                cursor.close()
         
-        return data
+        result = {}
+        for column, column_values in zip(columns, values):
+            numeric = all(
+                value is None or (isinstance(value, (int, float, Decimal)) and not isinstance(value, bool))
+                for value in column_values
+            )
+            if numeric and column_values:
+                result[column] = np.array(
+                    [np.nan if value is None else float(value) for value in column_values], dtype=float
+                )
+            else:
+                result[column] = np.array(column_values, dtype=object)
+        return result
@@ -0,0 +1,226 @@
+"""
+Fila de exportações em segundo plano
+As exportações grandes rodam em um pool local de threads, fora das
+requisições, e o arquivo final fica em disco até expirar
+O estado dos jobs fica em memória no processo que os recebeu
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app import db
+from app.services.card_engine import build_export_query, fetch_card
+from app.services.exports import (
+    EXPORT_FORMATS, stream_query, write_export_file, export_filename,
+    export_sheet_name, remove_file
+)
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+
+class ExportQueueFull(Exception):
+    """A fila global de exportações atingiu o limite"""
+
+
+class ExportUserLimit(Exception):
+    """O usuário já tem o máximo de exportações em andamento"""
+
+
+class ExportJob:
+    """Estado de uma exportação em segundo plano"""
+
+    def __init__(self, user_id, card, date_filter, consolidated, export_format, columns=None):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.card = card
+        self.date_filter = date_filter
+        self.consolidated = consolidated
+        self.format = export_format
+        self.columns = columns
+        self.status = QUEUED
+        self.rows_written = 0
+        self.total_rows = None
+        self.error = None
+        self.path = None
+        self.filename = export_filename(card.name, export_format, date_filter, consolidated)
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def progress(self):
+        if self.status == DONE:
+            return 100.0
+        if self.total_rows:
+            return round(min(self.rows_written / self.total_rows, 1) * 100, 1)
+        return None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'card': self.card.name,
+            'date': self.date_filter,
+            'consolidated': self.consolidated,
+            'format': self.format,
+            'columns': self.columns,
+            'status': self.status,
+            'rows_written': self.rows_written,
+            'total_rows': self.total_rows,
+            'progress': self.progress,
+            'filename': self.filename,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class ExportJobManager:
+    """
+    Recebe, executa e expira as exportações em segundo plano
+
+    EXPORT_JOBS_WORKERS: threads que geram arquivos
+    EXPORT_JOBS_MAX_QUEUE: jobs aguardando/rodando no total
+    EXPORT_JOBS_MAX_PER_USER: jobs aguardando/rodando por usuário
+    EXPORT_JOBS_TTL: segundos que o arquivo pronto fica disponível
+    EXPORT_JOBS_DIR: diretório dos arquivos gerados
+    """
+
+    def __init__(self):
+        self.app = None
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def init_app(self, app):
+        self.app = app
+        # Caminho absoluto: send_file resolve caminhos relativos a partir de app.root_path
+        self.directory = os.path.abspath(app.config.get('EXPORT_JOBS_DIR', 'exports'))
+        self.max_queue = app.config.get('EXPORT_JOBS_MAX_QUEUE', 20)
+        self.max_per_user = app.config.get('EXPORT_JOBS_MAX_PER_USER', 2)
+        self.ttl = app.config.get('EXPORT_JOBS_TTL', 3600)
+        self.workers = app.config.get('EXPORT_JOBS_WORKERS', 2)
+        os.makedirs(self.directory, exist_ok=True)
+        self._remove_stale_files()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix='export-job'
+            )
+        return self._executor
+
+    def submit(self, user_id, card, date_filter=None, consolidated=False, export_format='xlsx',
+               columns=None):
+        """
+        Enfileira a exportação; valida os parâmetros antes de aceitar o job
+        columns: colunas já resolvidas (resolve_columns); None exporta todas
+        Lança ExportQueueFull / ExportUserLimit quando os limites são atingidos
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f'Formato inválido: {export_format}')
+        build_export_query(card, date_filter=date_filter, consolidated=consolidated, columns=columns)
+
+        self.cleanup()
+        with self._lock:
+            active = [job for job in self.jobs.values() if job.status in ACTIVE_STATUSES]
+            if len(active) >= self.max_queue:
+                raise ExportQueueFull('Fila de exportação cheia, tente novamente em instantes')
+            if sum(1 for job in active if job.user_id == user_id) >= self.max_per_user:
+                raise ExportUserLimit('Limite de exportações simultâneas por usuário atingido')
+
+            job = ExportJob(user_id, card, date_filter, consolidated, export_format, columns)
+            self.jobs[job.id] = job
+
+        self.executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id, user_id=None):
+        """Retorna o job (do usuário, se informado) ou None"""
+        self.cleanup()
+        job = self.jobs.get(job_id)
+        if job is None or (user_id is not None and job.user_id != user_id):
+            return None
+        return job
+
+    def list(self, user_id):
+        self.cleanup()
+        jobs = [job for job in self.jobs.values() if job.user_id == user_id]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def cleanup(self):
+        """Remove jobs finalizados há mais de EXPORT_JOBS_TTL e seus arquivos"""
+        limit = time.time() - self.ttl
+        with self._lock:
+            expired = [
+                job for job in self.jobs.values()
+                if job.finished_at is not None and job.finished_at < limit
+            ]
+            for job in expired:
+                del self.jobs[job.id]
+        for job in expired:
+            if job.path:
+                remove_file(job.path)
+
+    def _remove_stale_files(self):
+        """Arquivos órfãos de execuções anteriores do processo"""
+        limit = time.time() - self.ttl
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isfile(path) and os.path.getmtime(path) < limit:
+                remove_file(path)
+
+    def _run(self, job):
+        """Executa o job em uma thread do pool"""
+        with self.app.app_context():
+            job.status = RUNNING
+            job.started_at = time.time()
+            path = os.path.join(self.directory, f"{job.id}{EXPORT_FORMATS[job.format][0]}")
+            try:
+                # Total estimado pelo próprio card quando ele é uma contagem
+                # (só para o progresso: uma falha aqui não interrompe a exportação)
+                if job.card.aggregate.replace(' ', '').upper() == 'COUNT(*)':
+                    try:
+                        job.total_rows = fetch_card(job.card, job.date_filter, job.consolidated)['value']
+                    except Exception as e:
+                        logger.warning(f"Total da exportação {job.id} indisponível: {e}")
+
+                query, params = build_export_query(
+                    job.card, date_filter=job.date_filter, consolidated=job.consolidated,
+                    columns=job.columns
+                )
+
+                def tracked(batches):
+                    for batch in batches:
+                        yield batch
+                        job.rows_written += len(batch)
+
+                with db.engine.connect() as conn:
+                    columns, batches = stream_query(conn, query, params)
+                    write_export_file(
+                        path, job.format, columns, tracked(batches),
+                        sheet_name=export_sheet_name(job.date_filter, job.consolidated)
+                    )
+
+                job.path = path
+                job.status = DONE
+            except Exception as e:
+                logger.error(f"Erro na exportação {job.id} ({job.card.name}): {e}")
+                remove_file(path)
+                job.error = str(e)
+                job.status = FAILED
+            finally:
+                job.finished_at = time.time()
+
+
+export_jobs = ExportJobManager()
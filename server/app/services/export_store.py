@@ -0,0 +1,107 @@
+"""
+Cache em disco dos arquivos de exportação de meses fechados
+Cada arquivo é endereçado pelo hash de card, período, formato e marca
+d'água dos dados (valor do card no mês); se os dados mudarem a chave
+muda e o arquivo antigo sai pelo LRU limitado por tamanho
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from app.services.exports import EXPORT_FORMATS, remove_file
+
+# Arquivos ainda sendo gerados no diretório do cache (ignorados pelo LRU)
+TMP_PREFIX = '.tmp-'
+
+
+class ExportArtifactStore:
+    """
+    Arquivos prontos em EXPORT_CACHE_DIR, limitados a EXPORT_CACHE_MAX_BYTES
+    O horário de modificação marca o último uso (LRU)
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.max_bytes = 0
+        self.enabled = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('EXPORT_CACHE_ENABLED', True)
+        # Caminho absoluto: send_file resolve caminhos relativos a partir de app.root_path
+        self.directory = os.path.abspath(app.config.get('EXPORT_CACHE_DIR', 'export_cache'))
+        self.max_bytes = app.config.get('EXPORT_CACHE_MAX_BYTES', 2 * 1024 ** 3)
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(card, date_filter, export_format, watermark, columns=None):
+        """Hash do conteúdo esperado do arquivo"""
+        payload = json.dumps({
+            'card': card.name,
+            'source': card.source,
+            'date_column': card.date_column,
+            'filters': sorted(card.filters.items(), key=repr),
+            'period': date_filter,
+            'format': export_format,
+            'watermark': watermark,
+            'columns': columns
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path_for(self, key, export_format):
+        return os.path.join(self.directory, f"{key}{EXPORT_FORMATS[export_format][0]}")
+
+    def temporary_path(self, suffix):
+        """
+        Arquivo temporário dentro do diretório do cache, no mesmo sistema
+        de arquivos do destino final de put()
+        """
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix=TMP_PREFIX, dir=self.directory)
+        os.close(fd)
+        return path
+
+    def get(self, key, export_format):
+        """Caminho do arquivo em cache (atualizando o uso) ou None"""
+        path = self.path_for(key, export_format)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, key, export_format, source_path):
+        """Move o arquivo gerado para o cache e aplica o limite de tamanho"""
+        path = self.path_for(key, export_format)
+        shutil.move(source_path, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """Remove os arquivos usados há mais tempo até caber em max_bytes"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.startswith(TMP_PREFIX):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                remove_file(path)
+                total -= size
+
+
+export_store = ExportArtifactStore()
@@ -0,0 +1,315 @@
+"""
+Exportação das listas detalhadas dos cards
+Lê as linhas em lotes por cursor no servidor e grava o arquivo em disco
+de forma incremental, mantendo o uso de memória constante
+"""
+import csv
+import io
+import os
+import tempfile
+import zlib
+from datetime import datetime
+from decimal import Decimal
+
+from flask import Response, current_app
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils import get_column_letter
+from sqlalchemy import text
+
+# Largura máxima das colunas na planilha
+MAX_COLUMN_WIDTH = 50
+
+# Formatos de exportação: extensão e mimetype
+EXPORT_FORMATS = {
+    'xlsx': ('.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('.csv', 'text/csv'),
+    'csv.gz': ('.csv.gz', 'application/gzip'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+}
+
+# Formatos enviados enquanto as linhas são lidas do banco
+STREAMED_FORMATS = ('csv', 'csv.gz')
+
+
+def safe_excel_value(value):
+    """Converter valor para formato seguro para Excel"""
+    if value is None:
+        return ''
+    elif isinstance(value, Decimal):
+        return float(value)
+    elif isinstance(value, (datetime, )):
+        # Datas datetime para string
+        return value.strftime('%Y-%m-%d %H:%M:%S') if hasattr(value, 'hour') else value.strftime('%Y-%m-%d')
+    elif hasattr(value, 'date'):
+        # Objetos date para string
+        return value.strftime('%Y-%m-%d')
+    else:
+        # Qualquer outro tipo: converter para string
+        return str(value)
+
+
+def excel_row(row):
+    """Converte a linha do banco para valores aceitos pela planilha"""
+    values = []
+    for value in row:
+        value = safe_excel_value(value)
+        if isinstance(value, str):
+            value = ILLEGAL_CHARACTERS_RE.sub('', value)
+        values.append(value)
+    return values
+
+
+def export_batch_size():
+    return current_app.config.get('EXPORT_BATCH_SIZE', 2000)
+
+
+def stream_query(conn, sql, params=None, batch_size=None):
+    """
+    Executa a query com cursor no servidor (stream_results)
+    Retorna (colunas, gerador de lotes de linhas)
+    """
+    batch_size = batch_size or export_batch_size()
+    result = conn.execution_options(
+        stream_results=True, max_row_buffer=batch_size
+    ).execute(text(sql), params or {})
+    columns = list(result.keys())
+
+    def batches():
+        try:
+            while True:
+                rows = result.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            result.close()
+
+    return columns, batches()
+
+
+def temporary_export_path(suffix):
+    """Cria um arquivo temporário para a exportação (EXPORT_TMP_DIR)"""
+    directory = current_app.config.get('EXPORT_TMP_DIR') or None
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    os.close(fd)
+    return path
+
+
+def remove_file(path):
+    """Remove o arquivo temporário ignorando se já não existir"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def temporary_file_response(path, filename, mimetype, chunk_size=64 * 1024):
+    """
+    Envia o arquivo temporário em blocos e o remove ao final da resposta
+    (inclusive se o cliente desconectar antes do fim)
+    """
+    size = os.path.getsize(path)
+
+    def generate():
+        try:
+            with open(path, 'rb') as handle:
+                while True:
+                    chunk = handle.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            remove_file(path)
+
+    return Response(generate(), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}',
+        'Content-Length': str(size)
+    })
+
+
+def write_xlsx(path, sheet_name, columns, batches):
+    """
+    Grava a planilha em modo write-only (linhas vão direto para o disco)
+    As larguras das colunas são medidas no cabeçalho e no primeiro lote,
+    pois o modo write-only exige definir as colunas antes da primeira linha
+    Retorna a quantidade de linhas gravadas
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name)
+
+    batches = iter(batches)
+    first_batch = [excel_row(row) for row in next(batches, [])]
+
+    widths = [len(str(header)) for header in columns]
+    for row in first_batch:
+        for index, value in enumerate(row):
+            widths[index] = max(widths[index], len(str(value)))
+    for index, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(index)].width = min(width + 2, MAX_COLUMN_WIDTH)
+
+    ws.append([str(header) for header in columns])
+    row_count = 0
+    for row in first_batch:
+        ws.append(row)
+        row_count += 1
+    for batch in batches:
+        for row in batch:
+            ws.append(excel_row(row))
+            row_count += 1
+
+    wb.save(path)
+    return row_count
+
+
+def iter_csv(columns, batches, compress=False):
+    """
+    Gera o CSV em blocos de bytes, um por lote de linhas
+    compress=True produz gzip incremental (csv.gz)
+    Valores convertidos com a mesma regra da planilha (safe_excel_value)
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def flush():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate(0)
+        return compressor.compress(data) if compressor else data
+
+    writer.writerow(columns)
+    yield flush()
+    for batch in batches:
+        writer.writerows([safe_excel_value(value) for value in row] for row in batch)
+        chunk = flush()
+        if chunk:
+            yield chunk
+    if compressor:
+        yield compressor.flush()
+
+
+def csv_response(conn, columns, batches, filename, compress=False):
+    """
+    Resposta em streaming do CSV; a conexão permanece aberta enquanto
+    o cliente recebe os dados e é fechada ao final da resposta
+    """
+    export_format = 'csv.gz' if compress else 'csv'
+
+    def generate():
+        try:
+            yield from iter_csv(columns, batches, compress)
+        finally:
+            conn.close()
+
+    response = Response(generate(), mimetype=EXPORT_FORMATS[export_format][1], headers={
+        'Content-Disposition': f'attachment; filename={filename}'
+    })
+    response.call_on_close(conn.close)
+    return response
+
+
+def parquet_value(value):
+    """Converte o valor para Parquet mantendo nulos e tipos numéricos"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, Decimal):
+        return float(value)
+    return safe_excel_value(value)
+
+
+def parquet_type(values):
+    """Tipo Arrow da coluna a partir do primeiro valor não nulo (texto se não houver)"""
+    import pyarrow as pa
+
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            return pa.bool_()
+        if isinstance(value, int):
+            return pa.int64()
+        if isinstance(value, float):
+            return pa.float64()
+        break
+    return pa.string()
+
+
+def write_parquet(path, columns, batches):
+    """
+    Grava o Parquet com um row group por lote (requer pyarrow)
+    Sem linhas grava um arquivo vazio com as colunas (tipo texto)
+    Retorna a quantidade de linhas gravadas
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError('Formato parquet indisponível: instale o pacote pyarrow')
+
+    writer = None
+    schema = None
+    row_count = 0
+    try:
+        for batch in batches:
+            values = [[parquet_value(value) for value in column] for column in zip(*batch)]
+            if schema is None:
+                schema = pa.schema([
+                    pa.field(str(name), parquet_type(column_values))
+                    for name, column_values in zip(columns, values)
+                ])
+                writer = pq.ParquetWriter(path, schema)
+            arrays = [
+                pa.array(
+                    column_values if field.type != pa.string() else
+                    [None if value is None else str(value) for value in column_values],
+                    type=field.type
+                )
+                for field, column_values in zip(schema, values)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            row_count += len(batch)
+        if writer is None:
+            schema = pa.schema([pa.field(str(name), pa.string()) for name in columns])
+            pq.write_table(schema.empty_table(), path)
+    finally:
+        if writer is not None:
+            writer.close()
+    return row_count
+
+
+def write_export_file(path, export_format, columns, batches, sheet_name='Dados'):
+    """
+    Grava a exportação em disco no formato pedido (xlsx, csv, csv.gz, parquet)
+    Retorna a quantidade de linhas gravadas
+    """
+    if export_format == 'xlsx':
+        return write_xlsx(path, sheet_name, columns, batches)
+    if export_format == 'parquet':
+        return write_parquet(path, columns, batches)
+
+    row_count = 0
+
+    def counted():
+        nonlocal row_count
+        for batch in batches:
+            row_count += len(batch)
+            yield batch
+
+    with open(path, 'wb') as handle:
+        for chunk in iter_csv(columns, counted(), compress=export_format == 'csv.gz'):
+            handle.write(chunk)
+    return row_count
+
+
+def export_sheet_name(date_filter=None, consolidated=False):
+    return 'Consolidado' if consolidated else date_filter.replace('-', '_')
+
+
+def export_filename(card_name, export_format, date_filter=None, consolidated=False):
+    """Nome do arquivo: <card>_<período>_<timestamp><extensão>"""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    period = 'consolidado' if consolidated else date_filter.replace('-', '')
+    return f"{card_name}_{period}_{timestamp}{EXPORT_FORMATS[export_format][0]}"
@@ -0,0 +1,45 @@
+"""
+Frequência observada das consultas de cards
+Cada leitura de card do período corrente (mês atual ou consolidado) soma
+um ponto para a chave (card, período); as contagens decaem a cada ciclo
+do pré-aquecimento, então as chaves mais pedidas recentemente ficam no topo
+"""
+import threading
+from collections import Counter
+
+
+class HotKeyTracker:
+    """Contagens por chave, limitadas a max_keys (as menores são descartadas)"""
+
+    def __init__(self, max_keys=1000, decay=0.5):
+        self.max_keys = max_keys
+        self.decay_factor = decay
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, key, weight=1):
+        with self._lock:
+            self.counts[key] += weight
+            if len(self.counts) > self.max_keys:
+                for stale, _ in self.counts.most_common()[self.max_keys:]:
+                    del self.counts[stale]
+
+    def top(self, n):
+        """As n chaves mais frequentes, da mais para a menos pedida"""
+        with self._lock:
+            return [key for key, _ in self.counts.most_common(n)]
+
+    def decay(self):
+        """Reduz as contagens e remove as chaves que deixaram de ser pedidas"""
+        with self._lock:
+            for key in list(self.counts):
+                self.counts[key] *= self.decay_factor
+                if self.counts[key] < 0.5:
+                    del self.counts[key]
+
+    def clear(self):
+        with self._lock:
+            self.counts.clear()
+
+
+hot_keys = HotKeyTracker()
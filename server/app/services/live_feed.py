@@ -0,0 +1,180 @@
+"""
+Feed ao vivo do dashboard de TV (Server-Sent Events)
+Uma única thread calcula as métricas a cada LIVE_FEED_INTERVAL segundos
+e o mesmo resultado é distribuído para todas as telas conectadas; cada
+tela recebe o estado completo ao conectar e depois apenas os valores
+que mudaram. Entre as atualizações, heartbeats (comentários SSE) mantêm
+a conexão aberta sem serializar nada
+EventSource não envia cabeçalhos: a tela troca o token JWT por um ticket
+de curta duração (LIVE_FEED_TICKET_TTL) que vai na URL do stream, para
+que o token de 24h não fique nos logs de acesso
+"""
+import logging
+import threading
+import time
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from app.services.metrics import dashboard_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def diff_values(previous, current):
+    """Chaves de current cujo valor mudou (ou é novo) em relação a previous"""
+    return {key: value for key, value in current.items() if previous.get(key, object()) != value}
+
+
+def sse_event(event, data, event_id=None):
+    """Mensagem SSE já codificada; data é JSON serializado"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {data}")
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+HEARTBEAT = b': ping\n\n'
+
+
+def _ticket_serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='live-feed-ticket')
+
+
+def issue_ticket(identity):
+    """Ticket assinado para abrir o stream em nome do usuário"""
+    return _ticket_serializer().dumps(str(identity))
+
+
+def verify_ticket(ticket):
+    """Usuário do ticket ou None se inválido/expirado"""
+    if not ticket:
+        return None
+    try:
+        return _ticket_serializer().loads(ticket, max_age=current_app.config.get('LIVE_FEED_TICKET_TTL', 60))
+    except BadSignature:
+        return None
+
+
+class LiveFeed:
+    """
+    LIVE_FEED_INTERVAL: segundos entre recálculos
+    LIVE_FEED_HEARTBEAT: segundos máximos sem enviar nada para a tela
+    LIVE_FEED_MAX_SUBSCRIBERS: telas conectadas ao mesmo tempo por processo
+    """
+
+    def __init__(self):
+        self.app = None
+        self.version = 0
+        self.snapshot = {}
+        self.last_update = None  # (versão anterior, evento já codificado)
+        self.subscribers = 0
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('LIVE_FEED_INTERVAL', 30)
+        self.heartbeat = app.config.get('LIVE_FEED_HEARTBEAT', 15)
+        self.max_subscribers = app.config.get('LIVE_FEED_MAX_SUBSCRIBERS', 100)
+
+    def compute(self):
+        """Valores enviados às telas (métricas do mês atual, do cache de cards)"""
+        return dashboard_metrics()
+
+    def refresh(self):
+        """Recalcula uma vez e publica para todos os inscritos se algo mudou"""
+        with self.app.app_context():
+            values = self.compute()
+            changed = diff_values(self.snapshot, values)
+            if not changed and self.version:
+                return False
+            update = sse_event('update', self.app.json.dumps(changed), event_id=self.version + 1)
+
+        with self._condition:
+            self.last_update = (self.version, update)
+            self.snapshot = values
+            self.version += 1
+            self._condition.notify_all()
+        return True
+
+    def _run(self):
+        """Thread de atualização; encerra quando não há mais telas conectadas"""
+        while True:
+            with self._condition:
+                if self.subscribers == 0:
+                    self._thread = None
+                    return
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Erro ao atualizar o feed ao vivo: {e}")
+            time.sleep(self.interval)
+
+    def _ensure_running(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='live-feed', daemon=True)
+            self._thread.start()
+
+    def subscribe(self):
+        """
+        Registra uma tela e retorna (gerador de eventos SSE, release)
+        release libera a vaga e pode ser chamado mais de uma vez: a rota o
+        registra no fechamento da resposta, que pode ocorrer antes de o
+        gerador começar (e o finally dele nunca rodar)
+        Lança RuntimeError se o limite de telas for atingido
+        """
+        with self._condition:
+            if self.subscribers >= self.max_subscribers:
+                raise RuntimeError('Limite de conexões do feed ao vivo atingido')
+            self.subscribers += 1
+            self._ensure_running()
+
+        released = []
+
+        def release():
+            with self._condition:
+                if not released:
+                    released.append(True)
+                    self.subscribers -= 1
+
+        return self._events(release), release
+
+    def _events(self, release):
+        try:
+            # Aguarda o primeiro cálculo para enviar o estado completo
+            with self._condition:
+                while self.version == 0:
+                    if not self._condition.wait(timeout=self.heartbeat):
+                        break
+                seen, snapshot = self.version, self.snapshot
+            if seen:
+                yield sse_event('snapshot', self.app.json.dumps(snapshot), event_id=seen)
+            else:
+                yield HEARTBEAT
+
+            while True:
+                with self._condition:
+                    if self.version == seen:
+                        self._condition.wait(timeout=self.heartbeat)
+                    version, current, last_update = self.version, self.snapshot, self.last_update
+
+                if version == seen:
+                    yield HEARTBEAT
+                elif last_update and last_update[0] == seen and version == seen + 1:
+                    # Caso comum: mesmo evento pré-serializado para todas as telas
+                    yield last_update[1]
+                elif seen == 0:
+                    yield sse_event('snapshot', self.app.json.dumps(current), event_id=version)
+                else:
+                    # Tela atrasada mais de uma versão: diferença desde o que ela viu
+                    changed = diff_values(snapshot, current)
+                    yield sse_event('update', self.app.json.dumps(changed), event_id=version)
+                seen, snapshot = version, current
+        finally:
+            release()
+
+
+live_feed = LiveFeed()
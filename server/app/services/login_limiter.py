@@ -0,0 +1,76 @@
+"""
+Limite de tentativas de login por IP e bloqueio temporário por email
+Os contadores ficam em memória no processo (cache LRU limitado, para que
+muitos IPs/emails diferentes não cresçam a memória sem limite)
+"""
+import threading
+import time
+
+from app.services.cache import TTLCache
+
+
+class LoginLimiter:
+    """
+    LOGIN_RATE_LIMIT_IP: tentativas por IP a cada LOGIN_RATE_WINDOW segundos
+    LOGIN_MAX_FAILURES: senhas erradas seguidas até bloquear o email
+    LOGIN_LOCKOUT_SECONDS: duração do bloqueio do email
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.ip_limit = 20
+        self.window = 60
+        self.max_failures = 5
+        self.lockout = 900
+        self.attempts = TTLCache(maxsize=10000, default_ttl=self.window, clock=clock)
+        self.failures = TTLCache(maxsize=10000, default_ttl=self.lockout, clock=clock)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ip_limit = app.config.get('LOGIN_RATE_LIMIT_IP', 20)
+        self.window = app.config.get('LOGIN_RATE_WINDOW', 60)
+        self.max_failures = app.config.get('LOGIN_MAX_FAILURES', 5)
+        self.lockout = app.config.get('LOGIN_LOCKOUT_SECONDS', 900)
+        self.attempts.configure(default_ttl=self.window)
+        self.failures.configure(default_ttl=self.lockout)
+
+    @staticmethod
+    def normalize(email):
+        return (email or '').strip().lower()
+
+    def hit_ip(self, ip):
+        """
+        Conta uma tentativa do IP (janela fixa)
+        Retorna os segundos até liberar se o limite foi excedido, senão None
+        """
+        now = self.clock()
+        with self._lock:
+            started, count = self.attempts.get(ip) or (now, 0)
+            count += 1
+            self.attempts.set(ip, (started, count), ttl=max(started + self.window - now, 0))
+        if count > self.ip_limit:
+            return max(int(started + self.window - now), 1)
+        return None
+
+    def locked(self, email):
+        """Segundos restantes do bloqueio do email ou None"""
+        entry = self.failures.get(self.normalize(email))
+        if entry is None or entry[1] is None:
+            return None
+        return max(int(entry[1] - self.clock()), 1)
+
+    def record_failure(self, email):
+        """Conta uma senha errada; ao atingir o limite bloqueia o email"""
+        key = self.normalize(email)
+        with self._lock:
+            count, _ = self.failures.get(key) or (0, None)
+            count += 1
+            locked_until = self.clock() + self.lockout if count >= self.max_failures else None
+            self.failures.set(key, (count, locked_until))
+        return locked_until is not None
+
+    def record_success(self, email):
+        self.failures.invalidate(self.normalize(email))
+
+
+login_limiter = LoginLimiter()
@@ -0,0 +1,355 @@
+"""
+Métricas, KPIs e gráficos do dashboard principal
+Os valores vêm dos cards (card_engine, com cache e rollup) e os gráficos
+de uma única query agregada cada (série mensal ou ranking), guardada em
+cache curto porque o frontend consulta estes endpoints a cada minuto
+Cada query de gráfico roda com um orçamento de latência (statement_timeout);
+se ela falhar ou o circuito do banco estiver aberto, o último gráfico bom
+é servido como stale e a falha fica em cache como um resultado normal
+Rankings de contagem por uma dimensão do rollup não consultam a view
+"""
+import logging
+import time
+from datetime import datetime
+
+from dateutil.relativedelta import relativedelta
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+
+from app import db
+from app.services.cache import TTLCache
+from app.services.circuit_breaker import db_breaker, set_statement_timeout
+from app.services.card_engine import STALE_ERRORS, fetch_cards, mark_stale, unavailable_result
+from app.services.card_registry import get_card, is_enabled
+from app.services.period import MONTH_EXPRESSION, Period, quote_column, range_predicate
+from app.services.rollup import RollupUnavailable, rank_dimension
+from app.services.schema_catalog import schema_catalog
+from app.services.single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+MONTH_LABELS = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+
+# Limites dos parâmetros months e limit dos gráficos
+MAX_MONTHS = 24
+MAX_LIMIT = 100
+
+# Resultados dos gráficos (TTL em METRICS_CACHE_TTL)
+metrics_cache = TTLCache(maxsize=256, default_ttl=60)
+
+# Último resultado bom de cada gráfico (TTL em CARD_STALE_MAX_AGE)
+stale_charts = TTLCache(maxsize=256, default_ttl=86400)
+
+
+class ChartDefinition:
+    """
+    Definição de um gráfico
+
+    kind: 'monthly' (série por mês da coluna de data) ou 'ranking'
+        (agrupado por group_column, do maior para o menor)
+    label_key/value_key: nomes dos campos de cada ponto no JSON
+    consolidated: ranking sobre toda a base (senão apenas o mês atual)
+    enabled_by: chave de configuração que precisa estar ligada (fontes ainda
+        não confirmadas no banco de origem)
+    """
+
+    def __init__(self, name, kind, source, aggregate, label_key, value_key,
+                 date_column=None, group_column=None, requires=None, consolidated=False,
+                 enabled_by=None):
+        self.name = name
+        self.kind = kind
+        self.source = source
+        self.aggregate = aggregate
+        self.label_key = label_key
+        self.value_key = value_key
+        self.date_column = date_column
+        self.group_column = group_column
+        self.requires = list(requires or [])
+        self.consolidated = consolidated
+        self.enabled_by = enabled_by
+
+    @property
+    def columns(self):
+        return [column for column in (self.date_column, self.group_column) if column] + self.requires
+
+
+CHARTS = {}
+
+
+def register_chart(chart):
+    CHARTS[chart.name] = chart
+    return chart
+
+
+def get_chart(name):
+    """Definição do gráfico ou None se não existir (ou estiver desligado)"""
+    chart = CHARTS.get(name)
+    if chart is None or not is_enabled(chart):
+        return None
+    return chart
+
+
+# Gráficos consultados pelo frontend (adaptar conforme estrutura real)
+# Os de consumo/faturamento ficam desligados até as tabelas serem confirmadas
+register_chart(ChartDefinition(
+    name='consumo-mensal', kind='monthly',
+    source='public.consumo', date_column='data', aggregate='SUM("kwh")', requires=['kwh'],
+    label_key='mes', value_key='consumo', enabled_by='METRICS_CONSUMO_ENABLED',
+))
+
+register_chart(ChartDefinition(
+    name='faturamento-evolucao', kind='monthly',
+    source='public.faturamento', date_column='data', aggregate='SUM("valor")', requires=['valor'],
+    label_key='mes', value_key='faturamento', enabled_by='METRICS_FATURAMENTO_ENABLED',
+))
+
+register_chart(ChartDefinition(
+    name='distribuicao-regional', kind='ranking',
+    source='public."V_CUSTOMER"', date_column='data cadastro', group_column='uf',
+    aggregate='COUNT(*)', label_key='regiao', value_key='clientes', consolidated=True,
+))
+
+register_chart(ChartDefinition(
+    name='top-clientes', kind='ranking',
+    source='public.consumo', date_column='data', group_column='cliente_id',
+    aggregate='SUM("kwh")', requires=['kwh'], label_key='cliente', value_key='consumo',
+    enabled_by='METRICS_CONSUMO_ENABLED',
+))
+
+
+# ========================================
+# BLOCOS COMPARTILHADOS
+# ========================================
+
+def month_start(now=None):
+    now = now or datetime.now()
+    return datetime(now.year, now.month, 1)
+
+
+def chart_available(chart):
+    return not schema_catalog.loaded or schema_catalog.has_columns(chart.source, *chart.columns)
+
+
+def latency_budget(name):
+    """Orçamento em milissegundos do endpoint (METRICS_LATENCY_BUDGETS)"""
+    budgets = current_app.config.get('METRICS_LATENCY_BUDGETS', {})
+    return budgets.get(name, budgets.get('default', 2000))
+
+
+def execute_with_budget(conn, sql, params, budget_ms):
+    """
+    Executa a query com statement_timeout (PostgreSQL) igual ao orçamento
+    O timeout vale só para a transação corrente (SET LOCAL)
+    """
+    set_statement_timeout(conn, budget_ms)
+    return conn.execute(text(sql), params).fetchall()
+
+
+def build_monthly_query(chart, months, now=None):
+    """Série dos últimos N meses (inclusive o atual) em uma query"""
+    start = month_start(now) - relativedelta(months=months - 1)
+    period = Period(start, month_start(now) + relativedelta(months=1))
+    where, params = range_predicate(chart.date_column, period, prefix='chart')
+    month = MONTH_EXPRESSION.format(column=quote_column(chart.date_column))
+    sql = f"""
+        SELECT {month} AS mes, {chart.aggregate} AS valor
+        FROM {chart.source}
+        WHERE {where}
+        GROUP BY 1
+        ORDER BY 1
+    """
+    return sql, params, start
+
+
+def ranking_period(chart, now=None):
+    if chart.consolidated:
+        return Period.consolidated()
+    return Period(month_start(now), month_start(now) + relativedelta(months=1))
+
+
+def build_ranking_query(chart, limit, now=None):
+    """Maiores valores agrupados por group_column em uma query"""
+    period = ranking_period(chart, now)
+    where, params = range_predicate(chart.date_column, period, prefix='chart')
+    group = quote_column(chart.group_column)
+    sql = f"""
+        SELECT {group} AS rotulo, {chart.aggregate} AS valor
+        FROM {chart.source}
+        WHERE {where}
+        GROUP BY {group}
+        ORDER BY valor DESC
+        LIMIT :limit
+    """
+    params['limit'] = int(limit)
+    return sql, params
+
+
+def _month_key(value):
+    if isinstance(value, str):
+        return value[:7]
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def compute_chart(chart, months=6, limit=10, now=None):
+    """
+    Pontos do gráfico (lista de dicts); lista vazia se a view não existir
+    Lança CircuitOpen sem consultar se o circuito do banco estiver aberto
+    """
+    if not chart_available(chart):
+        return []
+
+    budget = latency_budget(chart.name)
+    started = time.monotonic()
+    if chart.kind == 'ranking' and chart.aggregate.replace(' ', '').upper() == 'COUNT(*)':
+        # Contagem por dimensão do rollup: sem varrer a view de origem
+        try:
+            rows = rank_dimension(chart.source, chart.date_column, chart.group_column,
+                                  ranking_period(chart, now), limit)
+            return [{chart.label_key: label, chart.value_key: value} for label, value in rows]
+        except RollupUnavailable as e:
+            if e.__cause__ is not None:
+                logger.warning(f"Rollup indisponível para o gráfico {chart.name}: {e}")
+
+    if chart.kind == 'monthly':
+        sql, params, start = build_monthly_query(chart, months, now)
+    else:
+        sql, params = build_ranking_query(chart, limit, now)
+
+    try:
+        # Estourar o orçamento não indica banco fora do ar: não abre o circuito
+        with db_breaker.guard(count_timeouts=False), db.engine.connect() as conn:
+            rows = execute_with_budget(conn, sql, params, budget)
+    except OperationalError:
+        # Timeout do orçamento ou banco indisponível: decide fetch_chart
+        raise
+    except SQLAlchemyError as e:
+        # View inexistente sem catálogo carregado
+        logger.warning(f"Gráfico {chart.name} indisponível: {e}")
+        return []
+
+    if chart.kind == 'monthly':
+        values = {_month_key(month): value for month, value in rows if month is not None}
+        points = []
+        for offset in range(months):
+            month = start + relativedelta(months=offset)
+            key = month.strftime('%Y-%m')
+            points.append({
+                chart.label_key: MONTH_LABELS[month.month - 1],
+                'periodo': key,
+                chart.value_key: values.get(key) or 0
+            })
+    else:
+        points = [{chart.label_key: label, chart.value_key: value} for label, value in rows]
+
+    elapsed = (time.monotonic() - started) * 1000
+    if elapsed > budget:
+        logger.warning(f"Gráfico {chart.name} acima do orçamento: {elapsed:.0f}ms > {budget}ms")
+    return points
+
+
+def fetch_chart(chart, months=6, limit=10):
+    """
+    Gráfico com cache curto (METRICS_CACHE_TTL), chaveado pelo mês atual
+    Com o banco lento ou indisponível devolve o último resultado bom
+    (marcando a resposta como stale) ou lista vazia se não houver
+    """
+    key = (chart.name, months, limit, month_start().strftime('%Y-%m'))
+    ttl = current_app.config.get('METRICS_CACHE_TTL', 60)
+    cached = metrics_cache.get(key)
+    if cached is not None:
+        points, stale = cached
+        if stale:
+            mark_stale()
+        return points
+    try:
+        points = single_flight.do(('chart',) + key, lambda: compute_chart(chart, months=months, limit=limit))
+    except STALE_ERRORS as e:
+        logger.warning(f"Gráfico {chart.name} servido stale: {e or type(e).__name__}")
+        points = stale_charts.get(key)
+        # A falha também fica em cache: um gráfico acima do orçamento não é
+        # reexecutado a cada consulta do dashboard
+        metrics_cache.set(key, (points or [], points is not None), ttl=ttl)
+        if points is None:
+            return []
+        mark_stale()
+        return points
+    metrics_cache.set(key, (points, False), ttl=ttl)
+    stale_charts.set(key, points, ttl=current_app.config.get('CARD_STALE_MAX_AGE', 86400))
+    return points
+
+
+def current_month_filter():
+    return month_start().strftime('%Y-%m')
+
+
+def _cards(*names):
+    return [card for card in (get_card(name) for name in names) if card is not None]
+
+
+def fetch_cards_by_source(cards, date_filter=None, consolidated=False):
+    """
+    fetch_cards separado por view de origem: uma view com erro (ex.: tabela
+    ainda inexistente sem catálogo carregado, ou banco indisponível sem valor
+    anterior) deixa apenas os seus cards indisponíveis, sem derrubar o endpoint
+    """
+    by_source = {}
+    for card in cards:
+        by_source.setdefault(card.source, []).append(card)
+
+    results = {}
+    for source, source_cards in by_source.items():
+        try:
+            results.update(fetch_cards(source_cards, date_filter=date_filter, consolidated=consolidated))
+        except STALE_ERRORS as e:
+            logger.warning(f"Métricas de {source} indisponíveis: {e}")
+            results.update({card.name: unavailable_result() for card in source_cards})
+    return results
+
+
+# ========================================
+# ENDPOINTS
+# ========================================
+
+def dashboard_metrics():
+    """
+    Métricas principais (mês atual); clientes ativos sobre toda a base
+    Reaproveita os cards em cache: uma query por view nos cache miss
+    """
+    date_filter = current_month_filter()
+    month_cards = fetch_cards_by_source(
+        _cards('clientes_cadastrados', 'consumo_kwh', 'consumo_medio', 'faturamento'),
+        date_filter=date_filter
+    )
+    total_cards = fetch_cards_by_source(_cards('total_ativacoes'), consolidated=True)
+
+    def value(results, name):
+        result = results.get(name)
+        return result['value'] if result and result['available'] else None
+
+    return {
+        'kwhTotal': value(month_cards, 'consumo_kwh'),
+        'clientesAtivos': value(total_cards, 'total_ativacoes'),
+        'clientesNovos': value(month_cards, 'clientes_cadastrados'),
+        'faturamento': value(month_cards, 'faturamento'),
+        'consumoMedio': value(month_cards, 'consumo_medio'),
+        'periodo': date_filter
+    }
+
+
+# Cards exibidos como KPI com variação em relação ao mês anterior
+KPI_CARDS = ('clientes_cadastrados', 'total_ativacoes', 'consumo_kwh', 'faturamento')
+
+
+def dashboard_kpis():
+    """KPIs do mês atual com variação proporcional ao mês anterior"""
+    date_filter = current_month_filter()
+    cards = _cards(*KPI_CARDS)
+    results = fetch_cards_by_source(cards, date_filter=date_filter)
+    return {
+        'periodo': date_filter,
+        'kpis': [
+            {'name': card.name, 'title': card.title, **results[card.name]}
+            for card in cards
+        ]
+    }
@@ -0,0 +1,65 @@
+"""
+Verificação de senha (bcrypt) em um pool de threads limitado
+O bcrypt consome ~250ms de CPU por login; rodando em poucas threads
+dedicadas (o bcrypt libera o GIL) um pico de logins não disputa CPU com
+as demais requisições. Com o pool e a fila cheios o login é recusado na
+hora (429) em vez de enfileirar indefinidamente
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from app.models.usuario import check_password_hash
+
+
+class VerifierBusy(Exception):
+    """Pool de verificação de senha cheio"""
+
+
+class PasswordVerifier:
+    """
+    LOGIN_VERIFY_WORKERS: threads que executam o bcrypt
+    LOGIN_VERIFY_MAX_QUEUE: verificações aguardando além das que estão rodando
+    LOGIN_VERIFY_TIMEOUT: segundos máximos de espera pelo resultado
+    """
+
+    def __init__(self):
+        self.workers = 2
+        self.max_queue = 8
+        self.timeout = 10
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._executor = None
+
+    def init_app(self, app):
+        self.workers = app.config.get('LOGIN_VERIFY_WORKERS', 2)
+        self.max_queue = app.config.get('LOGIN_VERIFY_MAX_QUEUE', 8)
+        self.timeout = app.config.get('LOGIN_VERIFY_TIMEOUT', 10)
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix='password-verify'
+            )
+        return self._executor
+
+    def verify(self, password_hash, password_input):
+        """
+        Confere a senha no pool; lança VerifierBusy se não houver vaga
+        (ou se o resultado não vier em LOGIN_VERIFY_TIMEOUT segundos)
+        """
+        if not self._slots.acquire(blocking=False):
+            raise VerifierBusy('Muitos logins em andamento, tente novamente em instantes')
+        try:
+            future = self.executor.submit(check_password_hash, password_hash, password_input)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise VerifierBusy('Verificação de senha demorou demais, tente novamente em instantes')
+
+
+password_verifier = PasswordVerifier()
@@ -0,0 +1,108 @@
+"""
+Períodos e predicados de data para as queries dos cards
+Converte o filtro YYYY-MM em intervalos semiabertos [início, fim)
+para que o PostgreSQL consiga usar índices nas colunas de data
+"""
+from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
+
+# Expressão que trunca a coluna de data para o mês no banco de origem
+MONTH_EXPRESSION = "date_trunc('month', {column})"
+
+
+class Period:
+    """
+    Intervalo semiaberto [start, end) aplicado a uma coluna de data
+    Sem start/end o período é consolidado (toda a base com data preenchida)
+    """
+
+    def __init__(self, start=None, end=None):
+        self.start = start
+        self.end = end
+
+    @classmethod
+    def consolidated(cls):
+        return cls()
+
+    @property
+    def is_consolidated(self):
+        return self.start is None and self.end is None
+
+    def __eq__(self, other):
+        return isinstance(other, Period) and (self.start, self.end) == (other.start, other.end)
+
+    def __hash__(self):
+        return hash((self.start, self.end))
+
+    def __repr__(self):
+        return f"Period({self.start!r}, {self.end!r})"
+
+
+def parse_month(date_filter):
+    """
+    Converte YYYY-MM para datetime do primeiro dia do mês
+    Lança ValueError se o formato for inválido
+    """
+    try:
+        year, month = date_filter.split('-')
+        return datetime(int(year), int(month), 1)
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError(f"Filtro de data inválido: {date_filter!r} (esperado YYYY-MM)")
+
+
+def month_period(date_filter):
+    """Período do mês completo informado em YYYY-MM"""
+    start = parse_month(date_filter)
+    return Period(start, start + relativedelta(months=1))
+
+
+def previous_month_period(date_filter):
+    """Período do mês anterior ao informado em YYYY-MM"""
+    start = parse_month(date_filter) - relativedelta(months=1)
+    return Period(start, start + relativedelta(months=1))
+
+
+def proportional_period(period, day):
+    """
+    Recorta o período até o dia N (inclusive), equivalente a
+    EXTRACT(day FROM coluna) <= N sem impedir o uso de índice
+    """
+    end = min(period.start + timedelta(days=day), period.end)
+    return Period(period.start, end)
+
+
+def is_current_month(date_filter, now=None):
+    """Verifica se o filtro YYYY-MM corresponde ao mês corrente"""
+    now = now or datetime.now()
+    return parse_month(date_filter) == datetime(now.year, now.month, 1)
+
+
+def is_closed_month(date_filter, now=None):
+    """Verifica se o filtro YYYY-MM é de um mês já encerrado (anterior ao corrente)"""
+    now = now or datetime.now()
+    return parse_month(date_filter) < datetime(now.year, now.month, 1)
+
+
+def quote_column(column):
+    """Envolve o nome da coluna em aspas duplas ("data cadastro")"""
+    return '"' + column.replace('"', '""') + '"'
+
+
+def range_predicate(column, period, prefix='period'):
+    """
+    Monta o predicado SQL e os parâmetros para o período
+    Retorna (sql, params), ex.: ('"data ativo" >= :period_start AND "data ativo" < :period_end', {...})
+    """
+    col = quote_column(column)
+    if period.is_consolidated:
+        return f"{col} IS NOT NULL", {}
+
+    clauses = []
+    params = {}
+    if period.start is not None:
+        clauses.append(f"{col} >= :{prefix}_start")
+        params[f"{prefix}_start"] = period.start
+    if period.end is not None:
+        clauses.append(f"{col} < :{prefix}_end")
+        params[f"{prefix}_end"] = period.end
+    return ' AND '.join(clauses), params
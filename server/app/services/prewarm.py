@@ -0,0 +1,119 @@
+"""
+Pré-aquecimento dos caches do período corrente
+Uma thread recalcula em segundo plano, antes de expirarem, os cards mais
+pedidos do mês atual e do consolidado (hot_keys) e a lista de meses
+disponíveis, para que os usuários leiam sempre valores já em cache
+Cada processo aquece o próprio cache em memória
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from app.services.available_dates import available_dates_cache
+from app.services.card_engine import (
+    card_available, compute_missing_cards, store_card_result
+)
+from app.services.card_registry import get_card
+from app.services.hot_keys import hot_keys
+from app.services.period import is_current_month
+
+logger = logging.getLogger(__name__)
+
+
+class Prewarmer:
+    """
+    PREWARM_INTERVAL: segundos entre ciclos (menor que CARD_CACHE_TTL_CURRENT)
+    PREWARM_JITTER: variação aleatória do intervalo (fração, ex.: 0.1 = ±10%)
+    PREWARM_MAX_KEYS: chaves mais pedidas aquecidas por ciclo
+    PREWARM_MAX_CONCURRENCY: queries simultâneas do pré-aquecimento
+    """
+
+    def __init__(self):
+        self.app = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.last_run = None
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('PREWARM_INTERVAL', 45)
+        self.jitter = app.config.get('PREWARM_JITTER', 0.1)
+        self.max_keys = app.config.get('PREWARM_MAX_KEYS', 50)
+        self.max_concurrency = app.config.get('PREWARM_MAX_CONCURRENCY', 2)
+        if app.config.get('PREWARM_ENABLED', True):
+            self.start()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='prewarm', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def next_delay(self):
+        return max(1.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def _loop(self):
+        while not self._stop.wait(self.next_delay()):
+            try:
+                with self.app.app_context():
+                    self.run_once()
+            except Exception as e:
+                logger.error(f"Erro no pré-aquecimento: {e}")
+
+    def hot_groups(self):
+        """Cards quentes agrupados por período {(date_filter, consolidated): [cards]}"""
+        groups = {}
+        for name, date_filter, consolidated in hot_keys.top(self.max_keys):
+            if not consolidated and not is_current_month(date_filter):
+                continue  # Mês virou: a chave deixou de ser do período corrente
+            card = get_card(name)
+            if card is None or not card_available(card):
+                continue
+            groups.setdefault((date_filter, consolidated), []).append(card)
+        return groups
+
+    def warm_cards(self, cards, date_filter, consolidated):
+        """Recalcula os cards (uma query por view) e regrava no cache"""
+        with self.app.app_context():
+            computed = compute_missing_cards(cards, date_filter, consolidated)
+            for card in cards:
+                store_card_result(card, date_filter, consolidated, computed[card.name])
+
+    def warm_available_dates(self):
+        with self.app.app_context():
+            available_dates_cache.revalidate()
+
+    def run_once(self):
+        """Um ciclo: cards quentes e meses disponíveis, com concorrência limitada"""
+        groups = self.hot_groups()
+        hot_keys.decay()
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='prewarm') as executor:
+            futures = []
+            # Meses disponíveis: só se foram pedidos e expiram antes do próximo ciclo
+            if available_dates_cache.needs_revalidation(self.interval * (1 + self.jitter)):
+                futures.append(executor.submit(self.warm_available_dates))
+            futures += [
+                executor.submit(self.warm_cards, cards, date_filter, consolidated)
+                for (date_filter, consolidated), cards in groups.items()
+            ]
+            done, _ = wait(futures)
+        for future in done:
+            if future.exception() is not None:
+                logger.warning(f"Falha ao pré-aquecer: {future.exception()}")
+
+        self.last_run = time.time()
+        logger.info(
+            f"Pré-aquecimento: {sum(len(cards) for cards in groups.values())} cards "
+            f"em {len(groups)} períodos ({(time.monotonic() - started) * 1000:.0f}ms)"
+        )
+
+
+prewarmer = Prewarmer()
@@ -0,0 +1,358 @@
+"""
+Rollup diário das views de origem dos cards
+Mantém em um SQLite local a contagem de registros por dia de cada coluna
+de data (ex.: "data cadastro", "data ativo"), opcionalmente separada por
+algumas dimensões. O banco remoto é somente leitura, por isso o rollup
+fica fora dele. Após a carga inicial, a atualização relê apenas os
+últimos dias; a cada ROLLUP_FULL_REFRESH_INTERVAL a carga é completa
+para incluir registros que chegam atrasados ou com data retroativa.
+As cargas completas rodam em segundo plano; enquanto uma atualização
+está em andamento os cards são calculados direto na view de origem.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import text
+
+from app import db
+from app.services.circuit_breaker import db_breaker, set_statement_timeout
+from app.services.period import Period, quote_column, range_predicate
+from app.services.schema_catalog import schema_catalog
+
+logger = logging.getLogger(__name__)
+
+# Expressão que trunca a coluna de data para o dia no banco de origem
+DAY_EXPRESSION = 'CAST({column} AS date)'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_counts (
+    source TEXT NOT NULL,
+    date_column TEXT NOT NULL,
+    day TEXT NOT NULL,
+    dims TEXT NOT NULL DEFAULT '{}',
+    total INTEGER NOT NULL,
+    PRIMARY KEY (source, date_column, day, dims)
+);
+CREATE TABLE IF NOT EXISTS rollup_state (
+    source TEXT NOT NULL,
+    date_column TEXT NOT NULL,
+    refreshed_at REAL NOT NULL,
+    rebuilt_at REAL,
+    PRIMARY KEY (source, date_column)
+);
+"""
+
+
+class RollupUnavailable(Exception):
+    """O rollup não pode responder a consulta (desativado, não suportado ou falha)"""
+
+
+class RollupStore:
+    """Armazenamento local (SQLite) das contagens diárias"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+            # Arquivos criados antes da coluna da última carga completa
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(rollup_state)')]
+            if 'rebuilt_at' not in columns:
+                conn.execute('ALTER TABLE rollup_state ADD COLUMN rebuilt_at REAL')
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def refreshed_at(self, source, date_column):
+        """Momento (epoch) da última atualização ou None se nunca carregado"""
+        return self.state(source, date_column)[0]
+
+    def state(self, source, date_column):
+        """(última atualização, última carga completa) em epoch; None se nunca feitas"""
+        with self.connect() as conn:
+            row = conn.execute(
+                'SELECT refreshed_at, rebuilt_at FROM rollup_state WHERE source = ? AND date_column = ?',
+                (source, date_column)
+            ).fetchone()
+        return tuple(row) if row else (None, None)
+
+    def replace_days(self, source, date_column, rows, since_day=None):
+        """
+        Substitui as contagens a partir de since_day (ou todas, se None)
+        rows: iterável de (dia YYYY-MM-DD, dims JSON, total)
+        """
+        conn = self.connect()
+        try:
+            with conn:
+                if since_day is None:
+                    conn.execute(
+                        'DELETE FROM daily_counts WHERE source = ? AND date_column = ?',
+                        (source, date_column)
+                    )
+                else:
+                    conn.execute(
+                        'DELETE FROM daily_counts WHERE source = ? AND date_column = ? AND day >= ?',
+                        (source, date_column, since_day)
+                    )
+                conn.executemany(
+                    'INSERT OR REPLACE INTO daily_counts (source, date_column, day, dims, total) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    ((source, date_column, day, dims, total) for day, dims, total in rows)
+                )
+                now = time.time()
+                conn.execute(
+                    'INSERT INTO rollup_state (source, date_column, refreshed_at, rebuilt_at) '
+                    'VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (source, date_column) DO UPDATE SET '
+                    'refreshed_at = excluded.refreshed_at, '
+                    'rebuilt_at = COALESCE(excluded.rebuilt_at, rollup_state.rebuilt_at)',
+                    (source, date_column, now, now if since_day is None else None)
+                )
+        finally:
+            conn.close()
+
+    def sum_periods(self, source, date_column, periods, filters=None):
+        """
+        Soma as contagens diárias de cada período em uma única query
+        periods: lista de (nome, Period); filters: {dimensão: valor}
+        Retorna {nome: total}
+        """
+        columns = []
+        params = []
+        for name, period in periods:
+            clauses = []
+            if period.start is not None:
+                clauses.append('day >= ?')
+                params.append(period.start.date().isoformat())
+            if period.end is not None:
+                clauses.append('day < ?')
+                params.append(period.end.date().isoformat())
+            condition = ' AND '.join(clauses) or '1 = 1'
+            columns.append(f'COALESCE(SUM(CASE WHEN {condition} THEN total END), 0) AS "{name}"')
+
+        where = ['source = ?', 'date_column = ?']
+        params += [source, date_column]
+        for column, value in sorted((filters or {}).items()):
+            path = '$.' + json.dumps(column)
+            if value is None:
+                where.append('json_extract(dims, ?) IS NULL')
+                params.append(path)
+            else:
+                where.append('json_extract(dims, ?) = ?')
+                params += [path, value]
+
+        sql = f"SELECT {', '.join(columns)} FROM daily_counts WHERE {' AND '.join(where)}"
+        conn = self.connect()
+        try:
+            row = conn.execute(sql, params).fetchone()
+        finally:
+            conn.close()
+        return {name: row[index] for index, (name, _) in enumerate(periods)}
+
+    def rank_dimension(self, source, date_column, dimension, period, limit):
+        """Contagens por valor da dimensão no período, da maior para a menor"""
+        where = ['source = ?', 'date_column = ?']
+        params = [source, date_column]
+        if period.start is not None:
+            where.append('day >= ?')
+            params.append(period.start.date().isoformat())
+        if period.end is not None:
+            where.append('day < ?')
+            params.append(period.end.date().isoformat())
+
+        sql = f"""
+            SELECT json_extract(dims, ?) AS rotulo, SUM(total) AS valor
+            FROM daily_counts
+            WHERE {' AND '.join(where)}
+            GROUP BY rotulo
+            ORDER BY valor DESC
+            LIMIT ?
+        """
+        conn = self.connect()
+        try:
+            return conn.execute(sql, ['$.' + json.dumps(dimension)] + params + [int(limit)]).fetchall()
+        finally:
+            conn.close()
+
+
+_stores = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+# Cargas completas (inicial e periódica), fora das requisições
+_rebuild_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rollup-rebuild')
+_rebuilding = set()
+
+
+def rollup_enabled():
+    return bool(current_app.config.get('ROLLUP_ENABLED', True))
+
+
+def get_store():
+    """Instância do armazenamento para o caminho configurado"""
+    path = current_app.config.get('ROLLUP_DB_PATH', os.path.join('data', 'rollup.sqlite3'))
+    with _registry_lock:
+        if path not in _stores:
+            _stores[path] = RollupStore(path)
+        return _stores[path]
+
+
+def _refresh_lock(source, date_column):
+    with _registry_lock:
+        return _locks.setdefault((source, date_column), threading.Lock())
+
+
+def source_dimensions(source):
+    """
+    Dimensões configuradas para a view (ROLLUP_DIMENSIONS)
+    Com o catálogo carregado, as colunas que a view não tem são ignoradas
+    """
+    dims = current_app.config.get('ROLLUP_DIMENSIONS', {}).get(source, ())
+    if schema_catalog.loaded:
+        dims = [dim for dim in dims if schema_catalog.has_column(source, dim)]
+    return tuple(dims)
+
+
+def supports(card):
+    """O card pode ser respondido pelo rollup? (COUNT(*) e filtros só em dimensões)"""
+    aggregate = card.aggregate.replace(' ', '').upper()
+    return aggregate == 'COUNT(*)' and set(card.filters) <= set(source_dimensions(card.source))
+
+
+def _day_string(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)[:10]
+
+
+def refresh_rollup(source, date_column, full=False, now=None):
+    """
+    Recarrega as contagens diárias a partir do banco de origem
+    Incremental: relê só os últimos ROLLUP_REFRESH_DAYS dias
+    """
+    store = get_store()
+    dims = source_dimensions(source)
+    since = None
+    if not full:
+        now = now or datetime.now()
+        days = current_app.config.get('ROLLUP_REFRESH_DAYS', 3)
+        since = datetime(now.year, now.month, now.day) - timedelta(days=days)
+
+    period = Period(since, None) if since else Period.consolidated()
+    where, params = range_predicate(date_column, period, prefix='rollup')
+    day = DAY_EXPRESSION.format(column=quote_column(date_column))
+    dim_columns = ''.join(f", {quote_column(dim)}" for dim in dims)
+    group_by = ', '.join([day] + [quote_column(dim) for dim in dims])
+
+    with db_breaker.guard(), db.engine.connect() as conn:
+        set_statement_timeout(conn, current_app.config.get('ROLLUP_STATEMENT_TIMEOUT', 120000))
+        result = conn.execute(text(f"""
+            SELECT {day} AS dia{dim_columns}, COUNT(*) AS total
+            FROM {source}
+            WHERE {where}
+            GROUP BY {group_by}
+        """), params)
+        rows = [
+            (_day_string(row[0]), json.dumps(dict(zip(dims, row[1:-1])), sort_keys=True, default=str), row[-1])
+            for row in result
+        ]
+
+    store.replace_days(source, date_column, rows, since_day=since.date().isoformat() if since else None)
+    logger.info(f"Rollup atualizado: {source} {date_column} ({len(rows)} linhas, full={since is None})")
+    return len(rows)
+
+
+def _rebuild(app, source, date_column):
+    """Carga completa em segundo plano (aguarda uma atualização em andamento)"""
+    try:
+        with app.app_context(), _refresh_lock(source, date_column):
+            refresh_rollup(source, date_column, full=True)
+    except Exception as e:
+        logger.warning(f"Erro na carga completa do rollup {source} {date_column}: {e}")
+    finally:
+        with _registry_lock:
+            _rebuilding.discard((source, date_column))
+
+
+def schedule_rebuild(source, date_column):
+    """Agenda a carga completa, se ainda não houver uma agendada para a coluna"""
+    key = (source, date_column)
+    with _registry_lock:
+        if key in _rebuilding:
+            return
+        _rebuilding.add(key)
+    _rebuild_executor.submit(_rebuild, current_app._get_current_object(), source, date_column)
+
+
+def ensure_fresh(source, date_column):
+    """
+    Garante que o rollup da coluna existe e está dentro de ROLLUP_REFRESH_INTERVAL
+    Na requisição roda apenas a atualização incremental; a carga inicial e
+    a completa a cada ROLLUP_FULL_REFRESH_INTERVAL são agendadas em segundo
+    plano. Lança RollupUnavailable sem aguardar se o rollup ainda não foi
+    carregado ou se outra atualização da coluna está em andamento
+    """
+    store = get_store()
+    interval = current_app.config.get('ROLLUP_REFRESH_INTERVAL', 300)
+    max_age = current_app.config.get('ROLLUP_FULL_REFRESH_INTERVAL', 86400)
+    refreshed_at, rebuilt_at = store.state(source, date_column)
+    now = time.time()
+    if rebuilt_at is None or now - rebuilt_at >= max_age:
+        schedule_rebuild(source, date_column)
+        if refreshed_at is None:
+            raise RollupUnavailable(f"{source} {date_column}: carga inicial em andamento")
+    if now - refreshed_at < interval:
+        return
+
+    lock = _refresh_lock(source, date_column)
+    if not lock.acquire(blocking=False):
+        raise RollupUnavailable(f"{source} {date_column}: atualização em andamento")
+    try:
+        # Outra thread pode ter atualizado antes de obtermos o lock
+        refreshed_at = store.refreshed_at(source, date_column)
+        if refreshed_at is not None and time.time() - refreshed_at < interval:
+            return
+        refresh_rollup(source, date_column)
+    finally:
+        lock.release()
+
+
+def sum_card_periods(card, periods):
+    """
+    Valores do card para cada período, lidos do rollup
+    Lança RollupUnavailable quando o rollup não pode responder
+    """
+    if not rollup_enabled() or not supports(card):
+        raise RollupUnavailable(card.name)
+    try:
+        ensure_fresh(card.source, card.date_column)
+        return get_store().sum_periods(card.source, card.date_column, periods, card.filters)
+    except RollupUnavailable:
+        raise
+    except Exception as e:
+        raise RollupUnavailable(f"{card.name}: {e}") from e
+
+
+def rank_dimension(source, date_column, dimension, period, limit):
+    """
+    Ranking de contagem por dimensão no período, lido do rollup
+    Lança RollupUnavailable quando o rollup não pode responder
+    """
+    if not rollup_enabled() or dimension not in source_dimensions(source):
+        raise RollupUnavailable(f"{source}: {dimension}")
+    try:
+        ensure_fresh(source, date_column)
+        return get_store().rank_dimension(source, date_column, dimension, period, limit)
+    except RollupUnavailable:
+        raise
+    except Exception as e:
+        raise RollupUnavailable(f"{source}: {e}") from e
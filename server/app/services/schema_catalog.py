@@ -0,0 +1,151 @@
+"""
+Catálogo de tabelas, views e colunas do banco de origem
+Carregado do information_schema na inicialização, mantido em memória e
+atualizado por um timer; responde "a view X tem a coluna Y?" sem ida
+ao banco. Usado para validar as colunas pedidas na prévia/exportação e
+para pular queries de métricas em tabelas que não existem
+"""
+import logging
+import re
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import bindparam, text
+
+from app import db
+from app.services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Colunas de views fora do catálogo, lidas sob demanda (TTL em SCHEMA_CATALOG_TTL)
+catalog_cache = TTLCache(maxsize=64, default_ttl=3600)
+
+# Partes de um nome qualificado: "Nome Com Aspas" ou nome_sem_aspas
+_NAME_PART = re.compile(r'"((?:[^"]|"")*)"|([^."]+)')
+
+
+def split_relation(relation):
+    """
+    (schema, tabela) de um nome como public."V_CUSTOMER" ou public.clientes
+    Nomes sem aspas são normalizados para minúsculas, como no Postgres
+    """
+    parts = []
+    for quoted, plain in _NAME_PART.findall(relation):
+        parts.append(quoted.replace('""', '"') if quoted else plain.strip().lower())
+    if len(parts) == 1:
+        return 'public', parts[0]
+    return parts[-2], parts[-1]
+
+
+def load_columns(conn, source):
+    """Colunas da view na ordem do banco (query sem linhas)"""
+    result = conn.execute(text(f"SELECT * FROM {source} LIMIT 0"))
+    try:
+        return list(result.keys())
+    finally:
+        result.close()
+
+
+class SchemaCatalog:
+    """
+    Colunas de todas as tabelas/views dos schemas em SCHEMA_CATALOG_SCHEMAS
+    SCHEMA_CATALOG_REFRESH_INTERVAL: segundos entre atualizações (0 desliga o timer)
+    """
+
+    def __init__(self):
+        self.app = None
+        self.relations = {}
+        self.loaded_at = None
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def init_app(self, app):
+        self.app = app
+        self.schemas = list(app.config.get('SCHEMA_CATALOG_SCHEMAS', ['public']))
+        self.interval = app.config.get('SCHEMA_CATALOG_REFRESH_INTERVAL', 600)
+        if app.config.get('SCHEMA_CATALOG_ENABLED', True):
+            with app.app_context():
+                self.refresh()
+            self.schedule()
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    def load(self, conn):
+        """{(schema, tabela): [colunas]} em uma única query ao information_schema"""
+        result = conn.execute(text("""
+            SELECT table_schema, table_name, column_name
+            FROM information_schema.columns
+            WHERE table_schema IN :schemas
+            ORDER BY table_schema, table_name, ordinal_position
+        """).bindparams(bindparam('schemas', expanding=True)), {'schemas': self.schemas})
+        relations = {}
+        for schema, table, column in result:
+            relations.setdefault((schema, table), []).append(column)
+        return relations
+
+    def refresh(self):
+        """Recarrega o catálogo; em caso de erro mantém a versão anterior"""
+        try:
+            with db.engine.connect() as conn:
+                relations = self.load(conn)
+        except Exception as e:
+            logger.warning(f"Catálogo do banco indisponível: {e}")
+            return False
+        with self._lock:
+            self.relations = relations
+            self.loaded_at = time.time()
+        catalog_cache.clear()
+        return True
+
+    def schedule(self):
+        """Agenda a próxima atualização em uma thread daemon"""
+        if not self.interval:
+            return
+        self._timer = threading.Timer(self.interval, self._refresh_and_reschedule)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _refresh_and_reschedule(self):
+        try:
+            with self.app.app_context():
+                self.refresh()
+        finally:
+            self.schedule()
+
+    def columns(self, relation):
+        """Colunas da tabela/view ou None se ela não estiver no catálogo"""
+        return self.relations.get(split_relation(relation))
+
+    def has_relation(self, relation):
+        return split_relation(relation) in self.relations
+
+    def has_column(self, relation, column):
+        columns = self.columns(relation)
+        return columns is not None and column in columns
+
+    def has_columns(self, relation, *columns):
+        available = self.columns(relation)
+        return available is not None and all(column in available for column in columns)
+
+
+schema_catalog = SchemaCatalog()
+
+
+def source_columns(source):
+    """
+    Colunas da view de origem: do catálogo em memória quando ele a conhece,
+    senão lidas do banco e guardadas por SCHEMA_CATALOG_TTL
+    """
+    columns = schema_catalog.columns(source)
+    if columns is not None:
+        return columns
+
+    columns = catalog_cache.get(source)
+    if columns is None:
+        with db.engine.connect() as conn:
+            columns = load_columns(conn, source)
+        catalog_cache.set(source, columns, ttl=current_app.config.get('SCHEMA_CATALOG_TTL', 3600))
+    return columns
@@ -0,0 +1,87 @@
+"""
+Coalescência de cálculos idênticos simultâneos (single-flight)
+A primeira thread que pede uma chave calcula; as demais que chegam
+enquanto o cálculo está em andamento esperam e recebem o mesmo
+resultado (ou a mesma exceção), limitando a concorrência no banco ao
+número de chaves distintas em vez do número de usuários
+"""
+import threading
+
+from flask import current_app
+
+
+class SingleFlightTimeout(TimeoutError):
+    """O cálculo compartilhado não terminou dentro do tempo de espera"""
+
+
+class Call:
+    """Cálculo em andamento de uma chave"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Cálculos em andamento por chave, compartilhados entre as threads do processo"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key):
+        """
+        Retorna (call, leader): leader=True indica que o chamador deve
+        calcular e depois chamar complete/fail; senão deve chamar wait
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = self._calls[key] = Call()
+            return call, True
+
+    def complete(self, key, call, result):
+        call.result = result
+        self._finish(key, call)
+
+    def fail(self, key, call, error):
+        call.error = error
+        self._finish(key, call)
+
+    def _finish(self, key, call):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.done.set()
+
+    def wait(self, call, timeout=None):
+        """Resultado do cálculo de outra thread; SingleFlightTimeout se demorar demais"""
+        if timeout is None:
+            timeout = current_app.config.get('SINGLE_FLIGHT_TIMEOUT', 30)
+        if not call.done.wait(timeout):
+            raise SingleFlightTimeout('Tempo esgotado aguardando o cálculo em andamento')
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key, fn, timeout=None):
+        """Executa fn() uma vez por chave entre as chamadas simultâneas"""
+        call, leader = self.begin(key)
+        if not leader:
+            return self.wait(call, timeout)
+        try:
+            result = fn()
+        except BaseException as e:
+            self.fail(key, call, e)
+            raise
+        self.complete(key, call, result)
+        return result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+single_flight = SingleFlight()
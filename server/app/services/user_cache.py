@@ -0,0 +1,53 @@
+"""
+Cache dos perfis de usuário (tabela USUARIOS)
+/api/auth/verify e as rotas que precisam do perfil do usuário leem daqui
+em vez de consultar o banco a cada navegação; entradas expiram em
+USER_CACHE_TTL segundos e são invalidadas no login e na renovação do token
+"""
+from flask_jwt_extended import get_jwt_identity
+
+from app import db
+from app.models.usuario import Usuario
+from app.services.cache import TTLCache
+
+# Perfis (to_dict) por código do usuário
+user_cache = TTLCache(maxsize=1024, default_ttl=60)
+
+
+def init_user_cache(app):
+    """Aplica a configuração da aplicação ao cache de usuários"""
+    user_cache.configure(
+        maxsize=app.config.get('USER_CACHE_MAXSIZE', 1024),
+        default_ttl=app.config.get('USER_CACHE_TTL', 60)
+    )
+
+
+def cache_user(usuario):
+    """Grava o perfil de um usuário já carregado (ex.: no login)"""
+    profile = usuario.to_dict()
+    user_cache.set(usuario.codigo, profile)
+    return profile
+
+
+def invalidate_user(codigo):
+    user_cache.invalidate(int(codigo))
+
+
+def get_user_profile(codigo):
+    """Perfil do usuário pelo código (do cache ou do banco) ou None se não existir"""
+    try:
+        codigo = int(codigo)
+    except (TypeError, ValueError):
+        return None
+    profile = user_cache.get(codigo)
+    if profile is None:
+        usuario = db.session.get(Usuario, codigo)
+        if usuario is None:
+            return None
+        profile = cache_user(usuario)
+    return profile
+
+
+def current_user_profile():
+    """Perfil do usuário do token JWT da requisição atual"""
+    return get_user_profile(get_jwt_identity())
@@ -0,0 +1 @@
+# Arquivo init para o módulo utils
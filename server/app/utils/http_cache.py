@@ -0,0 +1,75 @@
+"""
+Respostas JSON com validação condicional e cabeçalhos de cache
+ETag forte calculado a partir do conteúdo (ou de uma marca d'água dos
+dados); If-None-Match igual responde 304 sem corpo
+Cache-Control depende do período: mês fechado pode ficar mais tempo no
+navegador, mês atual/consolidado revalida rapidamente
+Respostas com dados stale (banco lento/indisponível) não ficam em cache
+no navegador e levam o cabeçalho Warning: 110
+"""
+import hashlib
+
+from flask import current_app, g, jsonify, request
+
+from app.services.period import is_closed_month
+
+
+def compute_etag(data):
+    """Hash estável do conteúdo serializado pelo provider JSON (chaves ordenadas)"""
+    payload = current_app.json.dumps(data, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def period_cache_policy(date_filter=None, consolidated=False):
+    """
+    (max-age, stale-while-revalidate) em segundos para o período
+    HTTP_CACHE_MAX_AGE_CLOSED / HTTP_CACHE_SWR_CLOSED para meses fechados
+    HTTP_CACHE_MAX_AGE_CURRENT / HTTP_CACHE_SWR_CURRENT para os demais
+    """
+    config = current_app.config
+    try:
+        closed = not consolidated and bool(date_filter) and is_closed_month(date_filter)
+    except ValueError:
+        closed = False
+    if closed:
+        return (
+            config.get('HTTP_CACHE_MAX_AGE_CLOSED', 3600),
+            config.get('HTTP_CACHE_SWR_CLOSED', 86400)
+        )
+    return (
+        config.get('HTTP_CACHE_MAX_AGE_CURRENT', 15),
+        config.get('HTTP_CACHE_SWR_CURRENT', 60)
+    )
+
+
+def set_cache_headers(response, max_age, stale_while_revalidate=0):
+    """
+    Cache-Control privado (respostas dependem do token do usuário)
+    Vary: Authorization evita reaproveitar a resposta de outro usuário
+    """
+    directives = ['private', f'max-age={int(max_age)}']
+    if stale_while_revalidate:
+        directives.append(f'stale-while-revalidate={int(stale_while_revalidate)}')
+    response.headers['Cache-Control'] = ', '.join(directives)
+    response.vary.add('Authorization')
+    return response
+
+
+def conditional_json(data, etag=None, max_age=0, stale_while_revalidate=0):
+    """
+    Resposta JSON com ETag e Cache-Control; 304 se o cliente já tem a versão
+    etag: marca d'água já calculada; se omitido é o hash do conteúdo
+    """
+    response = jsonify(data)
+    response.set_etag(etag or compute_etag(data))
+    if g.get('data_stale'):
+        max_age, stale_while_revalidate = 0, 0
+        response.headers['Warning'] = '110 - "Response is Stale"'
+    set_cache_headers(response, max_age, stale_while_revalidate)
+    return response.make_conditional(request)
+
+
+def period_json(data, date_filter=None, consolidated=False, etag=None):
+    """conditional_json com a política de cache do período"""
+    max_age, stale_while_revalidate = period_cache_policy(date_filter, consolidated)
+    return conditional_json(data, etag=etag, max_age=max_age, stale_while_revalidate=stale_while_revalidate)
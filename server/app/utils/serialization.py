@@ -0,0 +1,132 @@
+"""
+Serialização JSON das respostas da API
+Decimal, date/datetime e linhas do SQLAlchemy (Row) são convertidos no
+próprio encoder, sem percorrer os dados antes; com orjson instalado a
+codificação é feita em C
+Respostas grandes são comprimidas (br/gzip) conforme o Accept-Encoding
+"""
+import gzip
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.engine import Row
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fallback para o json padrão
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def json_default(value):
+    """Tipos que o encoder não conhece nativamente"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Row):
+        return tuple(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, 'tolist'):
+        # Arrays/escalares NumPy
+        return value.tolist()
+    raise TypeError(f'Objeto do tipo {type(value).__name__} não é serializável em JSON')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Provider JSON da aplicação (jsonify, app.json.dumps)"""
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, **kwargs).decode('utf-8')
+
+    def dumps_bytes(self, obj, sort_keys=False, indent=None, **kwargs):
+        if orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            if sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=json_default, option=option)
+        return json.dumps(
+            obj, default=json_default, sort_keys=sort_keys, indent=indent,
+            ensure_ascii=False, separators=None if indent else (',', ':')
+        ).encode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if (self.compact is None and self._app.debug) or self.compact is False else None
+        return self._app.response_class(
+            self.dumps_bytes(obj, indent=indent) + b'\n', mimetype=self.mimetype
+        )
+
+
+def accepted_encoding():
+    """Melhor codificação aceita pelo cliente: br (se disponível), gzip ou None"""
+    encodings = request.accept_encodings
+    if brotli is not None and encodings['br']:
+        return 'br'
+    if encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """
+    Comprime respostas JSON acima de JSON_COMPRESS_MIN_SIZE bytes
+    Respostas em streaming, arquivos e 304 passam sem alteração
+    """
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code in (204, 304)
+        or response.status_code < 200
+        or 'Content-Encoding' in response.headers
+        or response.mimetype != 'application/json'
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config.get('JSON_COMPRESS_MIN_SIZE', 1024):
+        return response
+
+    encoding = accepted_encoding()
+    if encoding is None:
+        return response
+
+    level = current_app.config.get('JSON_COMPRESS_LEVEL', 6)
+    if encoding == 'br':
+        data = brotli.compress(data, quality=min(level, 11))
+    else:
+        data = gzip.compress(data, compresslevel=level)
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+
+    # O ETag é do corpo sem compressão: a versão comprimida não é idêntica
+    # byte a byte, então segue como ETag fraco (If-None-Match continua
+    # validando, If-Range/Range não aceitam)
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_json(app):
+    """Instala o provider JSON e a compressão das respostas"""
+    app.json = FastJSONProvider(app)
+    if app.config.get('JSON_COMPRESS_ENABLED', True):
+        app.after_request(compress_response)
@@ -25,8 +25,12 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_size': 10,
+        'max_overflow': int(os.environ.get('DB_POOL_MAX_OVERFLOW', 5)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
         'pool_recycle': 3600,
         'pool_pre_ping': True,
+        # Falha rápido quando o servidor do banco não responde (segundos)
+        'connect_args': {'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5))},
     }
     
     # JWT - Usando autenticação local (sem banco)
@@ -34,11 +38,130 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     
+    # Login: threads/fila do bcrypt e espera máxima pela verificação (segundos)
+    LOGIN_VERIFY_WORKERS = int(os.environ.get('LOGIN_VERIFY_WORKERS', 2))
+    LOGIN_VERIFY_MAX_QUEUE = int(os.environ.get('LOGIN_VERIFY_MAX_QUEUE', 8))
+    LOGIN_VERIFY_TIMEOUT = int(os.environ.get('LOGIN_VERIFY_TIMEOUT', 10))
+    
+    # Login: tentativas por IP na janela e bloqueio do email após falhas seguidas (segundos)
+    LOGIN_RATE_LIMIT_IP = int(os.environ.get('LOGIN_RATE_LIMIT_IP', 20))
+    LOGIN_RATE_WINDOW = int(os.environ.get('LOGIN_RATE_WINDOW', 60))
+    LOGIN_MAX_FAILURES = int(os.environ.get('LOGIN_MAX_FAILURES', 5))
+    LOGIN_LOCKOUT_SECONDS = int(os.environ.get('LOGIN_LOCKOUT_SECONDS', 900))
+    
+    # Cache dos perfis de usuário usados na verificação do token (segundos)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    USER_CACHE_MAXSIZE = int(os.environ.get('USER_CACHE_MAXSIZE', 1024))
+    
     # CORS
     CORS_ORIGINS = ['http://localhost:4200', 'http://localhost:5173', '*']
     
     # Modo somente leitura
     READ_ONLY_MODE = True
+    
+    # Espera máxima (segundos) por um cálculo idêntico em andamento (single-flight)
+    SINGLE_FLIGHT_TIMEOUT = int(os.environ.get('SINGLE_FLIGHT_TIMEOUT', 30))
+    
+    # Circuit breaker do banco: falhas seguidas para abrir e segundos até testar de novo
+    DB_BREAKER_FAILURES = int(os.environ.get('DB_BREAKER_FAILURES', 5))
+    DB_BREAKER_RESET_TIMEOUT = int(os.environ.get('DB_BREAKER_RESET_TIMEOUT', 30))
+    
+    # Tempo máximo (ms) das queries dos cards e da atualização do rollup;
+    # estourar conta como falha do banco no circuit breaker
+    CARD_STATEMENT_TIMEOUT = int(os.environ.get('CARD_STATEMENT_TIMEOUT', 10000))
+    ROLLUP_STATEMENT_TIMEOUT = int(os.environ.get('ROLLUP_STATEMENT_TIMEOUT', 120000))
+    
+    # Último valor bom dos cards/gráficos (segundos guardado e espera máxima
+    # pelo recálculo antes de servir o valor stale)
+    CARD_STALE_MAX_AGE = int(os.environ.get('CARD_STALE_MAX_AGE', 86400))
+    CARD_STALE_WAIT = float(os.environ.get('CARD_STALE_WAIT', 2))
+    
+    # Cache dos cards (segundos; TTL 0 para mês fechado = sem expiração)
+    CARD_CACHE_MAXSIZE = int(os.environ.get('CARD_CACHE_MAXSIZE', 2048))
+    CARD_CACHE_TTL_CURRENT = int(os.environ.get('CARD_CACHE_TTL_CURRENT', 60))
+    CARD_CACHE_TTL_CLOSED = int(os.environ.get('CARD_CACHE_TTL_CLOSED', 86400))
+    
+    # Pré-aquecimento dos cards mais pedidos (segundos; jitter em fração do intervalo)
+    PREWARM_ENABLED = os.environ.get('PREWARM_ENABLED', 'True').lower() == 'true'
+    PREWARM_INTERVAL = int(os.environ.get('PREWARM_INTERVAL', 45))
+    PREWARM_JITTER = float(os.environ.get('PREWARM_JITTER', 0.1))
+    PREWARM_MAX_KEYS = int(os.environ.get('PREWARM_MAX_KEYS', 50))
+    PREWARM_MAX_CONCURRENCY = int(os.environ.get('PREWARM_MAX_CONCURRENCY', 2))
+    
+    # Rollup diário local (contagens por dia usadas pelos cards COUNT(*))
+    ROLLUP_ENABLED = os.environ.get('ROLLUP_ENABLED', 'True').lower() == 'true'
+    ROLLUP_DB_PATH = os.environ.get('ROLLUP_DB_PATH', os.path.join('data', 'rollup.sqlite3'))
+    ROLLUP_REFRESH_INTERVAL = int(os.environ.get('ROLLUP_REFRESH_INTERVAL', 300))
+    ROLLUP_REFRESH_DAYS = int(os.environ.get('ROLLUP_REFRESH_DAYS', 3))
+    # Carga completa periódica (registros atrasados/retroativos fora dos últimos dias)
+    ROLLUP_FULL_REFRESH_INTERVAL = int(os.environ.get('ROLLUP_FULL_REFRESH_INTERVAL', 86400))
+    # Dimensões opcionais por view ("uf" atende o gráfico de distribuição regional)
+    ROLLUP_DIMENSIONS = {'public."V_CUSTOMER"': ['uf']}
+    
+    # Lista de meses disponíveis (segundos)
+    AVAILABLE_DATES_CHECK_INTERVAL = int(os.environ.get('AVAILABLE_DATES_CHECK_INTERVAL', 60))
+    AVAILABLE_DATES_MAX_AGE = int(os.environ.get('AVAILABLE_DATES_MAX_AGE', 86400))
+    AVAILABLE_DATES_BROWSER_MAX_AGE = int(os.environ.get('AVAILABLE_DATES_BROWSER_MAX_AGE', 300))
+    
+    # Cache HTTP das respostas do dashboard (segundos de max-age / stale-while-revalidate)
+    HTTP_CACHE_MAX_AGE_CLOSED = int(os.environ.get('HTTP_CACHE_MAX_AGE_CLOSED', 3600))
+    HTTP_CACHE_SWR_CLOSED = int(os.environ.get('HTTP_CACHE_SWR_CLOSED', 86400))
+    HTTP_CACHE_MAX_AGE_CURRENT = int(os.environ.get('HTTP_CACHE_MAX_AGE_CURRENT', 15))
+    HTTP_CACHE_SWR_CURRENT = int(os.environ.get('HTTP_CACHE_SWR_CURRENT', 60))
+    
+    # Compressão das respostas JSON (bytes mínimos e nível gzip/brotli)
+    JSON_COMPRESS_ENABLED = os.environ.get('JSON_COMPRESS_ENABLED', 'True').lower() == 'true'
+    JSON_COMPRESS_MIN_SIZE = int(os.environ.get('JSON_COMPRESS_MIN_SIZE', 1024))
+    JSON_COMPRESS_LEVEL = int(os.environ.get('JSON_COMPRESS_LEVEL', 6))
+    
+    # Métricas e gráficos do dashboard (cache em segundos, orçamentos em ms por gráfico)
+    METRICS_CACHE_TTL = int(os.environ.get('METRICS_CACHE_TTL', 60))
+    METRICS_LATENCY_BUDGETS = {
+        'default': int(os.environ.get('METRICS_LATENCY_BUDGET_MS', 2000)),
+        'consumo-mensal': 1500,
+        'faturamento-evolucao': 1500,
+        'distribuicao-regional': 1000,
+        'top-clientes': 1000,
+    }
+    
+    # Cards e gráficos de consumo/faturamento (tabelas public.consumo e
+    # public.faturamento ainda não confirmadas no banco de origem)
+    METRICS_CONSUMO_ENABLED = os.environ.get('METRICS_CONSUMO_ENABLED', 'False').lower() == 'true'
+    METRICS_FATURAMENTO_ENABLED = os.environ.get('METRICS_FATURAMENTO_ENABLED', 'False').lower() == 'true'
+    
+    # Feed ao vivo do dashboard de TV (SSE, em segundos)
+    LIVE_FEED_INTERVAL = int(os.environ.get('LIVE_FEED_INTERVAL', 30))
+    LIVE_FEED_HEARTBEAT = int(os.environ.get('LIVE_FEED_HEARTBEAT', 15))
+    LIVE_FEED_MAX_SUBSCRIBERS = int(os.environ.get('LIVE_FEED_MAX_SUBSCRIBERS', 100))
+    LIVE_FEED_TICKET_TTL = int(os.environ.get('LIVE_FEED_TICKET_TTL', 60))
+    
+    # Conjuntos de colunas extras por card, ex.: {'clientes_cadastrados': {'financial': ['código', ...]}}
+    CARD_COLUMN_SETS = {}
+    # Catálogo do banco (information_schema na inicialização + timer, em segundos)
+    SCHEMA_CATALOG_ENABLED = os.environ.get('SCHEMA_CATALOG_ENABLED', 'True').lower() == 'true'
+    SCHEMA_CATALOG_SCHEMAS = ['public']
+    SCHEMA_CATALOG_REFRESH_INTERVAL = int(os.environ.get('SCHEMA_CATALOG_REFRESH_INTERVAL', 600))
+    # Views fora do catálogo (colunas lidas sob demanda)
+    SCHEMA_CATALOG_TTL = int(os.environ.get('SCHEMA_CATALOG_TTL', 3600))
+    
+    # DataService (linhas por lote lidas do cursor no servidor)
+    DATA_SERVICE_BATCH_SIZE = int(os.environ.get('DATA_SERVICE_BATCH_SIZE', 2000))
+    
+    # Exportação (linhas lidas por lote e diretório dos arquivos temporários)
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 2000))
+    EXPORT_TMP_DIR = os.environ.get('EXPORT_TMP_DIR')
+    
+    # Exportações em segundo plano (POST /api/exports)
+    EXPORT_JOBS_DIR = os.environ.get('EXPORT_JOBS_DIR', 'exports')
+    EXPORT_JOBS_WORKERS = int(os.environ.get('EXPORT_JOBS_WORKERS', 2))
+    EXPORT_JOBS_MAX_QUEUE = int(os.environ.get('EXPORT_JOBS_MAX_QUEUE', 20))
+    EXPORT_JOBS_MAX_PER_USER = int(os.environ.get('EXPORT_JOBS_MAX_PER_USER', 2))
+    EXPORT_JOBS_TTL = int(os.environ.get('EXPORT_JOBS_TTL', 3600))
+    
+    # Cache em disco das exportações de meses fechados
+    EXPORT_CACHE_ENABLED = os.environ.get('EXPORT_CACHE_ENABLED', 'True').lower() == 'true'
+    EXPORT_CACHE_DIR = os.environ.get('EXPORT_CACHE_DIR', 'export_cache')
+    EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', 2 * 1024 ** 3))
 
 class DevelopmentConfig(Config):
     """Configuração de desenvolvimento"""
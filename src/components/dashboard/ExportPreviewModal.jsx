@@ -16,13 +16,17 @@ const ExportPreviewModal = ({
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [currentPage, setCurrentPage] = useState(1);
+  // Cursor de cada página já visitada (página 1 = sem cursor)
+  const [cursors, setCursors] = useState([null]);
+  const [hasNextPage, setHasNextPage] = useState(false);
   const [downloading, setDownloading] = useState(false);
   
   const itemsPerPage = 50;
 
   useEffect(() => {
     if (isOpen && cardName) {
-      fetchPreviewData();
+      setCursors([null]);
+      fetchPreviewData(1, [null]);
     }
   }, [isOpen, cardName, selectedDate]);
 
@@ -38,18 +42,22 @@ const ExportPreviewModal = ({
     };
   }, [isOpen]);
 
-  const fetchPreviewData = async () => {
+  // Busca uma página da prévia no servidor (paginação por cursor)
+  const fetchPreviewData = async (page = currentPage, pageCursors = cursors) => {
     setLoading(true);
     setError(null);
 
     try {
       const consolidated = selectedDate === 'consolidated';
+      const cursor = pageCursors[page - 1];
       const params = new URLSearchParams({
         consolidated: consolidated.toString(),
-        ...(consolidated ? {} : { date: selectedDate })
+        page_size: itemsPerPage.toString(),
+        ...(consolidated ? {} : { date: selectedDate }),
+        ...(cursor ? { cursor } : {})
       });
 
-      const response = await fetch(`/api/dashboard/export/${cardName}?${params}&preview=true`, {
+      const response = await fetch(`/api/dashboard/preview/${cardName}?${params}`, {
         headers: {
           'Authorization': `Bearer ${localStorage.getItem('access_token')}`
         }
@@ -62,6 +70,13 @@ const ExportPreviewModal = ({
         if (result.columns && result.rows) {
           setColumns(result.columns);
           setRows(result.rows);
+          setCurrentPage(page);
+          setHasNextPage(Boolean(result.next_cursor));
+          if (result.next_cursor) {
+            const nextCursors = pageCursors.slice(0, page);
+            nextCursors[page] = result.next_cursor;
+            setCursors(nextCursors);
+          }
           console.log('✅ Ordem das colunas preservada:', result.columns.slice(0, 5));
         } else {
           // Fallback para formato antigo (se houver)
@@ -97,13 +112,12 @@ const ExportPreviewModal = ({
     }
   };
 
-  const getPaginatedRows = () => {
-    const startIndex = (currentPage - 1) * itemsPerPage;
-    return rows.slice(startIndex, startIndex + itemsPerPage);
+  const goToPage = (page) => {
+    if (page < 1 || page > cursors.length || loading) return;
+    fetchPreviewData(page);
   };
 
-  const totalPages = Math.ceil(rows.length / itemsPerPage);
-  const paginatedRows = getPaginatedRows();
+  const firstRow = (currentPage - 1) * itemsPerPage + 1;
 
   if (!isOpen) return null;
 
@@ -136,7 +150,7 @@ const ExportPreviewModal = ({
                 </h2>
                 <p className="text-sm text-gray-600 dark:text-gray-400">
                   {selectedDate === 'consolidated' ? 'Dados consolidados' : `Período: ${selectedDate.replace(/(\d{4})-(\d{2})/, '$2/$1')}`}
-                  {rows.length > 0 && ` • Primeiros ${Math.min(rows.length, 50)} registros exibidos • ${columns.length} colunas`}
+                  {rows.length > 0 && ` • Página ${currentPage} • ${columns.length} colunas`}
                 </p>
               </div>
             </div>
@@ -180,7 +194,7 @@ const ExportPreviewModal = ({
                   <p className="text-red-600 dark:text-red-400 mb-2">Erro ao carregar dados</p>
                   <p className="text-sm text-gray-600 dark:text-gray-400">{error}</p>
                   <button
-                    onClick={fetchPreviewData}
+                    onClick={() => fetchPreviewData()}
                     className="mt-4 px-4 py-2 bg-blue-600 hover:bg-blue-700 text-white rounded-lg transition-colors"
                   >
                     Tentar novamente
@@ -212,7 +226,7 @@ const ExportPreviewModal = ({
                       </tr>
                     </thead>
                     <tbody>
-                      {paginatedRows.map((row, rowIndex) => (
+                      {rows.map((row, rowIndex) => (
                         <tr
                           key={`row-${rowIndex}`}
                           className="hover:bg-gray-50 dark:hover:bg-gray-700 border-b dark:border-gray-700 last:border-b-0"
@@ -233,28 +247,28 @@ const ExportPreviewModal = ({
                 </div>
 
                 {/* Paginação */}
-                {totalPages > 1 && (
+                {(currentPage > 1 || hasNextPage) && (
                   <div className="flex items-center justify-between mt-6 pt-4 border-t dark:border-gray-700">
                     <p className="text-sm text-gray-600 dark:text-gray-400">
-                      Mostrando {((currentPage - 1) * itemsPerPage) + 1} a {Math.min(currentPage * itemsPerPage, rows.length)} de {rows.length.toLocaleString('pt-BR')} registros
+                      Mostrando {firstRow.toLocaleString('pt-BR')} a {(firstRow + rows.length - 1).toLocaleString('pt-BR')} registros
                     </p>
                     
                     <div className="flex items-center space-x-2">
                       <button
-                        onClick={() => setCurrentPage(prev => Math.max(1, prev - 1))}
-                        disabled={currentPage === 1}
+                        onClick={() => goToPage(currentPage - 1)}
+                        disabled={currentPage === 1 || loading}
                         className="px-3 py-1 border rounded-lg hover:bg-gray-50 dark:hover:bg-gray-700 disabled:opacity-50 disabled:cursor-not-allowed dark:border-gray-600"
                       >
                         Anterior
                       </button>
                       
                       <span className="px-3 py-1 text-sm text-gray-600 dark:text-gray-400">
-                        Página {currentPage} de {totalPages}
+                        Página {currentPage}
                       </span>
                       
                       <button
-                        onClick={() => setCurrentPage(prev => Math.min(totalPages, prev + 1))}
-                        disabled={currentPage === totalPages}
+                        onClick={() => goToPage(currentPage + 1)}
+                        disabled={!hasNextPage || loading}
                         className="px-3 py-1 border rounded-lg hover:bg-gray-50 dark:hover:bg-gray-700 disabled:opacity-50 disabled:cursor-not-allowed dark:border-gray-600"
                       >
                         Próxima
@@ -3,19 +3,26 @@ import { Calendar, Download, ChevronDown, Users, Activity } from 'lucide-react';
 import MetricCard from '../../components/dashboard/MetricCard';
 import ExportPreviewModal from '../../components/dashboard/ExportPreviewModal';
 import { useDashboardCard } from '../../hooks/useDashboardCard';
+import { useDashboardCards } from '../../hooks/useDashboardCards';
 import { useSettings } from '../../contexts/SettingsContext';
 
+// Cards exibidos no dashboard (buscados em uma única requisição)
+const DASHBOARD_CARDS = ['clientes_cadastrados', 'total_ativacoes'];
+
 const Dashboard = () => {
   const [selectedDate, setSelectedDate] = useState('consolidated');
   const [availableDates, setAvailableDates] = useState([]);
   const [isDropdownOpen, setIsDropdownOpen] = useState(false);
   const [loading, setLoading] = useState(true);
 
+  // Dados de todos os cards em uma única requisição
+  const dashboardCards = useDashboardCards(DASHBOARD_CARDS, selectedDate);
+
   // ✅ NOVO Hook para buscar dados do card Total de Cadastrados
-  const clientesCadastrados = useDashboardCard('clientes_cadastrados', selectedDate);
+  const clientesCadastrados = useDashboardCard('clientes_cadastrados', selectedDate, dashboardCards);
   
   // Hook para buscar dados do card Total de Ativações
-  const totalAtivacoes = useDashboardCard('total_ativacoes', selectedDate);
+  const totalAtivacoes = useDashboardCard('total_ativacoes', selectedDate, dashboardCards);
   
   // Context de configurações
   const { settings } = useSettings();
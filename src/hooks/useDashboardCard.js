@@ -1,14 +1,17 @@
 import { useState, useEffect } from 'react';
 
-export const useDashboardCard = (cardName, selectedDate) => {
+// batch (opcional): resultado de useDashboardCards; quando informado, o card
+// usa os dados do lote em vez de fazer sua própria requisição
+export const useDashboardCard = (cardName, selectedDate, batch = null) => {
   const [data, setData] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [exporting, setExporting] = useState(false);
   const [showPreview, setShowPreview] = useState(false);
+  const usesBatch = Boolean(batch);
 
   useEffect(() => {
-    if (!cardName || !selectedDate) return;
+    if (!cardName || !selectedDate || usesBatch) return;
 
     const fetchCardData = async () => {
       setLoading(true);
@@ -42,7 +45,7 @@ export const useDashboardCard = (cardName, selectedDate) => {
     };
 
     fetchCardData();
-  }, [cardName, selectedDate]);
+  }, [cardName, selectedDate, usesBatch]);
 
   const exportData = async () => {
     if (exporting) return;
@@ -108,9 +111,9 @@ export const useDashboardCard = (cardName, selectedDate) => {
   };
 
   return { 
-    data, 
-    loading, 
-    error, 
+    data: batch ? batch.cards[cardName] ?? null : data, 
+    loading: batch ? batch.loading : loading, 
+    error: batch ? batch.error : error, 
     exportData, 
     exporting,
     showPreview,
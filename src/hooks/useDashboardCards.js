@@ -0,0 +1,50 @@
+import { useState, useEffect } from 'react';
+
+// Busca vários cards do dashboard em uma única requisição (/api/dashboard/cards)
+export const useDashboardCards = (cardNames, selectedDate) => {
+  const [cards, setCards] = useState({});
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState(null);
+
+  const namesKey = cardNames.join(',');
+
+  useEffect(() => {
+    if (!namesKey || !selectedDate) return;
+
+    const fetchCards = async () => {
+      setLoading(true);
+      setError(null);
+
+      try {
+        const consolidated = selectedDate === 'consolidated';
+        const params = new URLSearchParams({
+          names: namesKey,
+          consolidated: consolidated.toString(),
+          ...(consolidated ? {} : { date: selectedDate })
+        });
+
+        const response = await fetch(`/api/dashboard/cards?${params}`, {
+          headers: {
+            'Authorization': `Bearer ${localStorage.getItem('access_token')}`
+          }
+        });
+
+        if (response.ok) {
+          const result = await response.json();
+          setCards(result.cards || {});
+        } else {
+          throw new Error(`Erro ${response.status}: ${response.statusText}`);
+        }
+      } catch (err) {
+        console.error('Erro ao buscar dados dos cards:', err);
+        setError(err.message);
+      } finally {
+        setLoading(false);
+      }
+    };
+
+    fetchCards();
+  }, [namesKey, selectedDate]);
+
+  return { cards, loading, error };
+};
@@ -20,6 +20,7 @@ import {
   Filler
 } from 'chart.js';
 import { Line, Bar, Doughnut } from 'react-chartjs-2';
+import { dashboardService } from '../services/dashboardService';
 
 // Registrar componentes do Chart.js
 ChartJS.register(
@@ -156,24 +157,65 @@ const DashboardTV = () => {
     };
   }, []);
 
-  // Auto-refresh dos dados
+  // Dados ao vivo via SSE: estado completo ao conectar e depois só o que mudou
+  // A conexão usa um ticket de curta duração; se o servidor recusar (ticket
+  // expirado, 401) o EventSource desiste e reconectamos com um ticket novo
   useEffect(() => {
-    const fetchData = async () => {
+    let source = null;
+    let retryTimer = null;
+    let closed = false;
+
+    const applyValues = (event) => {
       try {
-        setData(prevData => ({
-          ...prevData,
-          kwhTotal: prevData.kwhTotal + Math.floor(Math.random() * 100),
-          consumoMedio: 342 + Math.floor(Math.random() * 10) - 5,
-          eficiencia: Math.min(100, Math.max(90, prevData.eficiencia + (Math.random() * 2 - 1)))
-        }));
+        const values = JSON.parse(event.data);
+        // Valores indisponíveis (null) mantêm o último valor exibido
+        const available = Object.fromEntries(
+          Object.entries(values).filter(([, value]) => value !== null)
+        );
+        setData(prevData => ({ ...prevData, ...available }));
+        setIsOnline(true);
       } catch (error) {
-        console.error('Erro ao buscar dados:', error);
+        console.error('Erro ao processar dados:', error);
       }
     };
 
-    fetchData();
-    const timer = setInterval(fetchData, 30000);
-    return () => clearInterval(timer);
+    const scheduleReconnect = () => {
+      if (!closed) {
+        retryTimer = setTimeout(connect, 5000);
+      }
+    };
+
+    const connect = async () => {
+      try {
+        // api renova o access_token expirado antes de emitir o ticket
+        const ticket = await dashboardService.getStreamTicket();
+        if (closed) return;
+        source = new EventSource(dashboardService.getStreamUrl(ticket));
+      } catch (error) {
+        setIsOnline(false);
+        scheduleReconnect();
+        return;
+      }
+
+      source.addEventListener('snapshot', applyValues);
+      source.addEventListener('update', applyValues);
+      source.onerror = () => {
+        setIsOnline(navigator.onLine && source.readyState === EventSource.OPEN);
+        // CONNECTING: o EventSource tenta de novo sozinho; CLOSED: desistiu
+        if (source.readyState === EventSource.CLOSED) {
+          source.close();
+          scheduleReconnect();
+        }
+      };
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    };
   }, []);
 
   // Configuração dos gráficos
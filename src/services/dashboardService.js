@@ -35,5 +35,14 @@ export const dashboardService = {
   getKPIs: async () => {
     const response = await api.get('/dashboard/kpis');
     return response.data;
-  }
+  },
+
+  // Ticket de curta duração para o feed ao vivo (SSE)
+  getStreamTicket: async () => {
+    const response = await api.post('/dashboard/stream/ticket');
+    return response.data.ticket;
+  },
+
+  // URL do feed ao vivo para o EventSource
+  getStreamUrl: (ticket) => `${api.defaults.baseURL}/dashboard/stream?ticket=${encodeURIComponent(ticket)}`
 };